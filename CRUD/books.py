@@ -1,14 +1,53 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sqlalchemy import select
+from sqlalchemy import String, cast, delete, func, insert, literal, null, or_, select, tuple_, union_all, update, Row
 
 from fastapi import HTTPException
 
 from loguru import logger
 
-from database.books_db import BookModel
+from database.books_db import BookModel, BookTombstoneModel
 
-from schema.book_schema import BookSchema
+from schema.book_schema import BookSchema, BooklIdShcema
+
+from cache import TTLCache
+
+from monitoring.counters import books_counter
+
+from typing import Any, AsyncIterable, AsyncIterator, Optional, Sequence
+
+import os
+
+from datetime import datetime, timedelta
+
+
+
+
+# Кэш горячих книг для read_book_by_id; сбрасывается при update_book/delete_book
+BOOK_CACHE_MAXSIZE = int(os.getenv("BOOK_CACHE_MAXSIZE", "10000"))
+BOOK_CACHE_TTL_SECONDS = float(os.getenv("BOOK_CACHE_TTL_SECONDS", "60"))
+# После записи книга какое-то время не кэшируется: чтение с отстающей реплики вернуло бы старую строку
+BOOK_CACHE_WRITE_HOLD_SECONDS = float(os.getenv("BOOK_CACHE_WRITE_HOLD_SECONDS", os.getenv("READ_YOUR_WRITES_SECONDS", "5")))
+
+book_cache = TTLCache("books", maxsize=BOOK_CACHE_MAXSIZE, ttl=BOOK_CACHE_TTL_SECONDS)
+
+# Лента изменений отдает только изменения старше этого окна: now() - время начала транзакции,
+# и транзакция, закоммиченная позже, могла бы получить время раньше уже выданного курсора
+BOOK_CHANGES_SETTLE_SECONDS = float(os.getenv("BOOK_CHANGES_SETTLE_SECONDS", "5"))
+
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Наименьшая строка больше всех строк с этим префиксом в collation "C" (порядок кодовых точек)"""
+    chars = list(prefix)
+    while chars:
+        code = ord(chars.pop()) + 1
+        # Суррогаты в UTF-8 не кодируются - следующий символ после них
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return "".join(chars) + chr(code)
+    return None
 
 
 
@@ -33,6 +72,7 @@ class BooksCRUD:
             session.add(new_book)
             await session.commit()
             await session.refresh(new_book)
+            books_counter.add(1)
 
             logger.info(f"Books.create_book: Книга создана с ID {new_book.id}")
             return new_book
@@ -44,36 +84,259 @@ class BooksCRUD:
 
 
 
-    async def read_all_books(
+    async def bulk_create(
+        self,
+        session: AsyncSession,
+        items: AsyncIterable[Any],
+        batch_size: int
+    ) -> dict:
+        """Массовое создание книг пачками: один INSERT ... RETURNING id и одна транзакция на пачку"""
+        logger.info(f"Books.bulk_create: Массовое добавление книг, размер пачки {batch_size}")
+
+        batches = []
+        batch = []
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                batches.append(await self._insert_batch(session, len(batches), batch))
+                batch = []
+        if batch:
+            batches.append(await self._insert_batch(session, len(batches), batch))
+
+        created = sum(b["count"] for b in batches if b["status"] == "success")
+        failed = sum(b["count"] for b in batches if b["status"] == "failed")
+        logger.info(f"Books.bulk_create: Создано {created} книг, не создано {failed}")
+        return {"created": created, "failed": failed, "batches": batches}
+
+
+
+    async def _insert_batch(
         self,
-        session: AsyncSession
-    ) -> list[BookModel]:
-        """Получение всех книг"""
+        session: AsyncSession,
+        batch_number: int,
+        batch: list
+    ) -> dict:
+        """Вставка одной пачки; ошибка откатывает только эту пачку"""
         try:
-            logger.info("Books.read_all_books: Получение всех книг")
+            rows = [BookSchema.model_validate(item).model_dump() for item in batch]
+
+            result = await session.execute(insert(BookModel).returning(BookModel.id), rows)
+            ids = list(result.scalars().all())
+            await session.commit()
+            books_counter.add(len(ids))
+
+            return {"batch": batch_number, "status": "success", "count": len(ids), "ids": ids}
 
-            query = select(BookModel)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Books.bulk_create: Ошибка в пачке {batch_number} - {e}")
+            return {"batch": batch_number, "status": "failed", "count": len(batch), "error": str(e)}
+
+
+
+    async def read_books_page(
+        self,
+        session: AsyncSession,
+        limit: int,
+        after: Optional[tuple[str, int]] = None,
+        author: Optional[str] = None,
+        title: Optional[str] = None
+    ) -> tuple[Sequence[Row], Optional[tuple[str, int]]]:
+        """Получение страницы книг (keyset-пагинация).
+
+        Без фильтра страницы идут по id, с фильтром - по (author, id) или (title, id) в collation "C",
+        чтобы индекс ix_books_*_keyset отдавал строки уже в порядке страницы: каждая страница - короткий
+        проход по индексу от курсора до конца префикса. Курсор и следующая позиция - (ключ, id),
+        ключ пустой без фильтра.
+        """
+        try:
+            logger.info(f"Books.read_books_page: Получение страницы книг после {after}")
+
+            query = select(BookModel.id, BookModel.title, BookModel.author)
+
+            # При двух фильтрах порядок по автору, название проверяется на найденных строках
+            prefix, sort_column = (author, BookModel.author) if author else (title, BookModel.title)
+            if author and title:
+                query = query.where(BookModel.title.startswith(title, autoescape=True))
+
+            if prefix:
+                sort_key = sort_column.collate("C")
+                # Диапазон вместо LIKE: границы известны и в generic plan prepared statement
+                query = query.where(sort_key >= prefix)
+                upper_bound = _prefix_upper_bound(prefix)
+                if upper_bound is not None:
+                    query = query.where(sort_key < upper_bound)
+                if after is not None:
+                    query = query.where(tuple_(sort_key, BookModel.id) > tuple_(*after))
+                order_by = (sort_key, BookModel.id)
+            else:
+                if after is not None:
+                    query = query.where(BookModel.id > after[1])
+                order_by = (BookModel.id,)
+
+            # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+            query = query.order_by(*order_by).limit(limit + 1)
             result = await session.execute(query)
-            books = result.scalars().all()
+            books = result.all()
+
+            next_after = None
+            if len(books) > limit:
+                books = books[:limit]
+                last = books[-1]
+                next_after = (getattr(last, sort_column.key) if prefix else "", last.id)
+
+            logger.info(f"Books.read_books_page: Найдено {len(books)} книг")
+            return books, next_after
 
-            logger.info(f"Books.read_all_books: Найдено {len(books)} книг")
-            return books
-           
         except Exception as e:
-            logger.error(f"Books.read_all_books: Ошибка при получении книг - {e}")
+            logger.error(f"Books.read_books_page: Ошибка при получении книг - {e}")
             raise HTTPException(status_code=500, detail=f"Ошибка при получении книг: {str(e)}")
 
 
 
+    async def search_books(
+        self,
+        session: AsyncSession,
+        q: str,
+        limit: int,
+        offset: int = 0
+    ) -> tuple[Sequence[Row], Optional[int]]:
+        """Поиск книг по названию и автору: полнотекстовый + триграммный (опечатки), с ранжированием"""
+        try:
+            logger.info(f"Books.search_books: Поиск книг по запросу '{q}'")
+
+            tsquery = func.websearch_to_tsquery("simple", q)
+            score = (
+                func.ts_rank(BookModel.search_vector, tsquery)
+                + func.greatest(func.similarity(BookModel.title, q), func.similarity(BookModel.author, q))
+            ).label("score")
+
+            query = (
+                select(BookModel.id, BookModel.title, BookModel.author, score)
+                .where(or_(
+                    BookModel.search_vector.op("@@")(tsquery),
+                    BookModel.title.op("%")(q),
+                    BookModel.author.op("%")(q),
+                ))
+                .order_by(score.desc(), BookModel.id)
+                .offset(offset)
+                .limit(limit + 1)
+            )
+            result = await session.execute(query)
+            books = result.all()
+
+            next_offset = None
+            if len(books) > limit:
+                books = books[:limit]
+                next_offset = offset + limit
+
+            logger.info(f"Books.search_books: Найдено {len(books)} книг")
+            return books, next_offset
+
+        except Exception as e:
+            logger.error(f"Books.search_books: Ошибка при поиске книг - {e}")
+            raise HTTPException(status_code=500, detail=f"Ошибка при поиске книг: {str(e)}")
+
+
+
+    async def stream_books(
+        self,
+        session: AsyncSession,
+        batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Потоковое чтение всех книг через серверный курсор, пачками по batch_size"""
+        try:
+            logger.info("Books.stream_books: Начало потоковой выгрузки книг")
+
+            query = (
+                select(BookModel.id, BookModel.title, BookModel.author)
+                .order_by(BookModel.id)
+                .execution_options(yield_per=batch_size)
+            )
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+            logger.info("Books.stream_books: Потоковая выгрузка книг завершена")
+
+        except Exception as e:
+            logger.error(f"Books.stream_books: Ошибка при выгрузке книг - {e}")
+            raise
+
+
+
+    async def read_changes(
+        self,
+        session: AsyncSession,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None
+    ) -> tuple[Sequence[Row], bool]:
+        """Изменения книг после позиции (changed_at, id): обновления и удаления, keyset-пагинация"""
+        try:
+            logger.info(f"Books.read_changes: Получение изменений после {after}")
+
+            settled = func.now() - timedelta(seconds=BOOK_CHANGES_SETTLE_SECONDS)
+
+            upserts = (
+                select(
+                    BookModel.id,
+                    literal("upsert", String).label("op"),
+                    BookModel.title,
+                    BookModel.author,
+                    BookModel.updated_at.label("changed_at"),
+                )
+                .where(BookModel.updated_at < settled)
+                .order_by(BookModel.updated_at, BookModel.id)
+                .limit(limit + 1)
+            )
+            deletes = (
+                select(
+                    BookTombstoneModel.book_id.label("id"),
+                    literal("delete", String).label("op"),
+                    cast(null(), String).label("title"),
+                    cast(null(), String).label("author"),
+                    BookTombstoneModel.deleted_at.label("changed_at"),
+                )
+                .where(BookTombstoneModel.deleted_at < settled)
+                .order_by(BookTombstoneModel.deleted_at, BookTombstoneModel.book_id)
+                .limit(limit + 1)
+            )
+            if after is not None:
+                upserts = upserts.where(tuple_(BookModel.updated_at, BookModel.id) > tuple_(*after))
+                deletes = deletes.where(tuple_(BookTombstoneModel.deleted_at, BookTombstoneModel.book_id) > tuple_(*after))
+
+            # Каждая ветка читает не больше limit + 1 строк по своему индексу
+            changes = union_all(select(upserts.subquery()), select(deletes.subquery())).subquery()
+            query = select(changes).order_by(changes.c.changed_at, changes.c.id).limit(limit + 1)
+            result = await session.execute(query)
+            rows = result.all()
+
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            logger.info(f"Books.read_changes: Найдено {len(rows)} изменений")
+            return rows, has_more
+
+        except Exception as e:
+            logger.error(f"Books.read_changes: Ошибка при получении изменений - {e}")
+            raise HTTPException(status_code=500, detail=f"Ошибка при получении изменений: {str(e)}")
+
+
+
     async def read_book_by_id(
         self,
         session: AsyncSession,
         book_id: int
-    ) -> BookModel:
-        """Получение книги по ID"""
+    ) -> BooklIdShcema:
+        """Получение книги по ID (read-through кэш перед БД)"""
         try:
             logger.info(f"Books.read_book_by_id: Поиск книги с ID {book_id}")
 
+            cached = book_cache.get(book_id)
+            if cached is not None:
+                return cached
+
+            version = book_cache.version
             query = select(BookModel).where(BookModel.id == book_id)
             result = await session.execute(query)
             book = result.scalar_one_or_none()
@@ -83,9 +346,15 @@ class BooksCRUD:
                 raise HTTPException(status_code=404, detail = f"Книга не найдена")
             
             logger.info(f"Books.read_book_by_id: Книга с ID {book_id} найдена")
+
+            # В кэше лежит отвязанный от сессии снимок, а не ORM-объект
+            snapshot = BooklIdShcema.model_validate(book)
+            book_cache.set(book_id, snapshot, version=version)
             
-            return book
+            return snapshot
         
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Books.read_book_by_id: Ошибка при поиске книги - {e}")
             raise HTTPException(status_code=500, detail=f"Ошибка при поиске книги: {str(e)}")
@@ -101,19 +370,30 @@ class BooksCRUD:
         try:
             logger.info(f"Books.update_book: Обновление книги с ID {book_id}")
 
-            book = await self.read_book_by_id(session,book_id)
+            # Один UPDATE ... RETURNING вместо SELECT + UPDATE + SELECT
+            query = (
+                update(BookModel)
+                .where(BookModel.id == book_id)
+                .values(title=update_data.title, author=update_data.author, updated_at=func.now())
+                .returning(BookModel)
+            )
+            result = await session.execute(query)
+            book = result.scalar_one_or_none()
 
-            book.title = update_data.title
-            book.author = update_data.author
+            if not book:
+                await session.rollback()
+                logger.warning(f"Books.update_book: Книга с ID {book_id} не найдена")
+                raise HTTPException(status_code=404, detail="Книга не найдена")
 
             await session.commit()
-            await session.refresh(book)
-
+            book_cache.invalidate(book_id, hold=BOOK_CACHE_WRITE_HOLD_SECONDS)
 
             logger.info(f"Books.update_book: Книга с ID {book_id} обновлена")
 
             return book
         
+        except HTTPException:
+            raise
         except Exception as e:
             await session.rollback()
             logger.error(f"Books.update_book: Ошибка при обновлении книги - {e}")
@@ -129,19 +409,32 @@ class BooksCRUD:
         try:
             logger.info(f"Books.delete_book: Удаление книги с ID {book_id}")
 
-            book = await self.read_book_by_id(session, book_id)
+            # Один DELETE ... RETURNING вместо SELECT + DELETE
+            query = delete(BookModel).where(BookModel.id == book_id).returning(BookModel.title)
+            result = await session.execute(query)
+            title = result.scalar_one_or_none()
+
+            if title is None:
+                await session.rollback()
+                logger.warning(f"Books.delete_book: Книга с ID {book_id} не найдена")
+                raise HTTPException(status_code=404, detail="Книга не найдена")
 
-            await session.delete(book)
+            # След удаления пишется в той же транзакции, что и DELETE
+            await session.execute(insert(BookTombstoneModel).values(book_id=book_id))
             await session.commit()
+            book_cache.invalidate(book_id, hold=BOOK_CACHE_WRITE_HOLD_SECONDS)
+            books_counter.add(-1)
 
             logger.info(f"Books.delete_book: Книга с ID {book_id} удалена")
 
             return {
                 "status": "success",
-                "message": f"Книга '{book.title}' успешно удалена",
+                "message": f"Книга '{title}' успешно удалена",
                 "deleted_book_id": book_id
             }
         
+        except HTTPException:
+            raise
         except Exception as e:
             await session.rollback()
             logger.error(f"Books.delete_book: Ошибка при удалении книги - {e}")
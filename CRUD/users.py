@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sqlalchemy import select
+from sqlalchemy import select, Row
 
 from fastapi import HTTPException, status
 
@@ -10,9 +10,11 @@ from database.users_db import UserModel
 
 from schema.user_schema import UserSchema
 
-from auth.authorization import get_user_by_username, get_password_hash
+from monitoring.counters import users_counter
 
-from typing import  Optional
+from auth.authorization import get_user_by_username, invalidate_principal
+
+from typing import  Optional, Sequence
 
 
 
@@ -24,10 +26,11 @@ class UsersCRUD:
     async def create_user(
             self,
             session: AsyncSession,
-            user_data: UserSchema
+            user_data: UserSchema,
+            hashed_password: str
             ) -> UserModel:
         
-        """Создает нового пользователя"""
+        """Создает нового пользователя; пароль хэширует вызывающий - до того, как взять сессию"""
         # Проверяем, нет ли уже такого пользователя
         if await get_user_by_username(session, user_data.username):
             raise HTTPException(
@@ -39,8 +42,6 @@ class UsersCRUD:
             status_code= status.HTTP_400_BAD_REQUEST,
             detail = "Email already registered"
             )
-        # Хэшируем пароль
-        hashed_password = get_password_hash(user_data.password)
         try:
             logger.info("create_user: запрос на создание нового пользователя успешен")
             # Создаем пользователя
@@ -53,6 +54,7 @@ class UsersCRUD:
             session.add(user)
             await session.commit()
             await session.refresh(user)
+            users_counter.add(1)
             logger.info("create_user: запрос на создание нового пользователя выполнен")
             return user
         except Exception as e:
@@ -64,13 +66,14 @@ class UsersCRUD:
     async def read_all_users(
             self,
             session: AsyncSession,
-            )-> list[UserModel]:
+            )-> Sequence[Row]:
         try:
             logger.info("Users.read_all_users: считывание всех пользователей")
             
-            query = select(UserModel)
+            # Только поля UserSchema, строками Row вместо ORM-объектов
+            query = select(UserModel.username, UserModel.email, UserModel.password)
             result = await session.execute(query)
-            users = result.scalars().all()
+            users = result.all()
             logger.info("Users.read_all_users: считывание всех пользователей выполнено")
             return users
         except Exception as e:
@@ -117,6 +120,7 @@ class UsersCRUD:
             
             await session.commit()
             await session.refresh(user)
+            invalidate_principal(user_id)
             logger.info(f"Users.read_user_by_id: Пользователь с ID {user_id} обновлен")
             return user
         
@@ -138,6 +142,8 @@ class UsersCRUD:
 
             await session.delete(user)
             await session.commit()
+            invalidate_principal(user_id)
+            users_counter.add(-1)
 
             return {
                 "status": "success",
@@ -6,7 +6,9 @@ from database.users_db import UserModel
 
 from session.session_db import SessionDep
 
-from auth.authorization import get_current_user_from_token
+from auth.authorization import get_current_user_from_token, get_principal_from_token, get_user_by_id
+
+from schema.user_schema import Principal
 
 
 
@@ -26,9 +28,31 @@ async def get_current_user(
 
 
 
+# Текущий пользователь только по claims токена, без запроса в БД
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Зависимость для авторизации без обращения к БД"""
+    return get_principal_from_token(token)
+
+
+
 # Админ роль
-def require_admin(user: UserModel = Depends(get_current_user)):
-    if user.role != "admin":
+def require_admin(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if principal.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return principal
+
+
+
+# Админ роль с проверкой по БД - для изменяющих операций, где устаревший role в токене недопустим
+async def require_admin_db(
+    session: SessionDep,
+    principal: Principal = Depends(get_current_principal)
+) -> UserModel:
+    user = await get_user_by_id(session, principal.id)
+    if user is None or user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
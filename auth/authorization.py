@@ -1,5 +1,13 @@
 import os
 
+import hashlib
+
+import time
+
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
 from sqlalchemy import select
 
 from passlib.context import CryptContext
@@ -16,13 +24,30 @@ from typing import  Optional
 
 from database.users_db import UserModel
 
+from schema.user_schema import Principal
+
+from cache import TTLCache
+
+from monitoring.metrics import PRINCIPAL_CACHE_SAVED_SECONDS, PASSWORD_HASH_QUEUE, PASSWORD_HASH_SECONDS
+
 
 
 
 # Настройки для JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+
+# Кэш аутентифицированных пользователей по хэшу токена: убирает запрос в users на каждый запрос
+PRINCIPAL_CACHE_MAXSIZE = int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+principal_cache = TTLCache("principals", maxsize=PRINCIPAL_CACHE_MAXSIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Скользящее среднее времени запроса пользователя - оценка экономии на каждом попадании в кэш
+_user_lookup_seconds = 0.0
 
 
 # Настройка хэширования паролей
@@ -41,15 +66,109 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 
+# bcrypt занимает сотни миллисекунд CPU, поэтому из async-кода он вызывается только через пул потоков.
+# Семафор ограничивает число одновременных вычислений, остальные ждут в event loop, не блокируя его.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(PASSWORD_HASH_WORKERS)))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_semaphore = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+
+
+
+async def _run_in_hash_pool(operation: str, func, *args):
+    PASSWORD_HASH_QUEUE.inc()
+    try:
+        await _hash_semaphore.acquire()
+    finally:
+        PASSWORD_HASH_QUEUE.dec()
+
+    try:
+        with PASSWORD_HASH_SECONDS.labels(operation=operation).time():
+            return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_semaphore.release()
+
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Хэширует пароль в пуле потоков"""
+    return await _run_in_hash_pool("hash", get_password_hash, password)
+
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверяет пароль в пуле потоков"""
+    return await _run_in_hash_pool("verify", verify_password, plain_password, hashed_password)
+
+
+
+def shutdown_password_hashing() -> None:
+    """Останавливает пул потоков хэширования при завершении приложения"""
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
+
 def create_access_token(data: dict) -> str:
-    """Создает JWT токен"""
+    """Создает короткоживущий JWT токен доступа"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "access"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 
+def create_refresh_token(data: dict) -> str:
+    """Создает долгоживущий JWT токен для /auth/refresh"""
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "type": "refresh"})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+
+def create_token_pair(user: UserModel) -> dict:
+    """Выдает пару access/refresh; uid и role в claims позволяют авторизовать запрос без БД"""
+    claims = {"sub": user.username, "uid": user.id, "role": user.role}
+    return {
+        "access_token": create_access_token(claims),
+        "refresh_token": create_refresh_token({"sub": user.username, "uid": user.id}),
+        "token_type": "bearer",
+    }
+
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code= status.HTTP_401_UNAUTHORIZED,
+        detail = "Could not validate credentials",
+        headers = {"WWW-Authenticate": "Bearer"},
+    )
+
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    """Проверяет подпись, срок и тип токена"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms= [ALGORITHM])
+    except JWTError:
+        raise _credentials_exception()
+    # Токены без типа выпущены до появления refresh - считаем их access
+    if payload.get("type", "access") != token_type or payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+
+def get_principal_from_token(token: str) -> Principal:
+    """Получает пользователя из claims JWT без запроса в БД"""
+    payload = decode_token(token, "access")
+    if payload.get("uid") is None or payload.get("role") is None:
+        raise _credentials_exception()
+    return Principal(id=payload["uid"], username=payload["sub"], role=payload["role"])
+
+
+
 async def get_user_by_username(session: AsyncSession, username: str) -> Optional[UserModel]:
     """Находит пользователя по username"""
     result = await session.execute(select(UserModel).where(UserModel.username == username))
@@ -71,12 +190,27 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[UserMo
 
 
 
-async def authenticate_user(session: AsyncSession, username: str, password: str) -> Optional[UserModel]:
-    """Аутентифицирует пользователя"""
-    user = await get_user_by_username(session, username)
-    if not user or not verify_password(password, user.password):
-        return None
-    return user
+def _token_key(token: str) -> str:
+    """Ключ кэша: сам токен в памяти не храним"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+
+def _detached_user(user: UserModel) -> UserModel:
+    """Копия пользователя, не привязанная ни к одной сессии"""
+    return UserModel(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        password=user.password,
+        role=user.role,
+    )
+
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Сбрасывает закэшированных пользователей после изменения или удаления"""
+    principal_cache.invalidate_where(lambda user: user.id == user_id)
 
 
 
@@ -85,21 +219,27 @@ async def get_current_user_from_token(
         session: AsyncSession
 ) -> UserModel:
     """Получает пользователя из JWT токена"""
-    credentials_exception = HTTPException(
-        status_code= status.HTTP_401_UNAUTHORIZED,
-        detail = "Could not validate credentials",
-        headers = {"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms= [ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+    global _user_lookup_seconds
+
+    # Запись живет не дольше exp токена, поэтому попадание означает валидный токен
+    key = _token_key(token)
+    cached = principal_cache.get(key)
+    if cached is not None:
+        PRINCIPAL_CACHE_SAVED_SECONDS.inc(_user_lookup_seconds)
+        return cached
+
+    payload = decode_token(token, "access")
+    username: str = payload["sub"]
     
+    version = principal_cache.version
+    started = time.perf_counter()
     user = await get_user_by_username(session, username)
+    elapsed = time.perf_counter() - started
+    _user_lookup_seconds = elapsed if not _user_lookup_seconds else 0.9 * _user_lookup_seconds + 0.1 * elapsed
+
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    expires_in = payload.get("exp", 0) - time.time()
+    principal_cache.set(key, _detached_user(user), ttl=expires_in, version=version)
     return user
\ No newline at end of file
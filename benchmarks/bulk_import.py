@@ -0,0 +1,112 @@
+"""Скорость импорта книг: по одной через /books/add_book против /books/bulk_add (JSON-массив и NDJSON).
+
+Запуск из корня проекта (нужен PostgreSQL из DATABASE_URL):
+    python benchmarks/bulk_import.py [--single 2000] [--bulk 100000] [--batch-sizes 100 500 2000]
+
+Сервер запускается отдельным процессом (uvicorn, один воркер). Все созданные книги
+помечены префиксом названия и удаляются в конце.
+"""
+import argparse
+
+import asyncio
+
+import json
+
+import time
+
+import uuid
+
+import httpx
+
+from sqlalchemy import text
+
+from common import bench_token, run_server
+
+
+
+
+def make_books(prefix: str, count: int) -> list[dict]:
+    return [{"title": f"{prefix}{i}", "author": f"Автор {i % 1000}"} for i in range(count)]
+
+
+
+async def single_rows(client: httpx.AsyncClient, books: list[dict], concurrency: int) -> float:
+    queue: asyncio.Queue = asyncio.Queue()
+    for book in books:
+        queue.put_nowait(book)
+
+    async def worker():
+        while not queue.empty():
+            response = await client.post("/books/add_book", json=queue.get_nowait())
+            response.raise_for_status()
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start_time
+
+
+
+async def bulk(client: httpx.AsyncClient, books: list[dict], batch_size: int, ndjson: bool) -> float:
+    if ndjson:
+        body = "".join(json.dumps(book, ensure_ascii=False) + "\n" for book in books).encode("utf-8")
+        content_type = "application/x-ndjson"
+    else:
+        body = json.dumps(books, ensure_ascii=False).encode("utf-8")
+        content_type = "application/json"
+
+    start_time = time.perf_counter()
+    response = await client.post(
+        "/books/bulk_add", params={"batch_size": batch_size}, content=body, headers={"Content-Type": content_type}
+    )
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start_time
+    result = response.json()
+    assert result["created"] == len(books) and result["failed"] == 0, result
+    return elapsed
+
+
+
+async def cleanup(prefix: str) -> None:
+    from session.session_db import engine
+
+    async with engine.begin() as conn:
+        deleted = await conn.execute(text("DELETE FROM books WHERE title LIKE :prefix"), {"prefix": prefix + "%"})
+    await engine.dispose()
+    print(f"Удалено тестовых книг: {deleted.rowcount}")
+
+
+
+async def run(base_url: str, args) -> None:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    headers = {"Authorization": f"Bearer {bench_token()}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=None) as client:
+        elapsed = await single_rows(client, make_books(prefix + "single-", args.single), args.concurrency)
+        print(f"{'add_book x' + str(args.concurrency):>22}: {args.single / elapsed:9.0f} книг/с ({args.single} за {elapsed:.2f} с)")
+
+        for ndjson in (False, True):
+            for batch_size in args.batch_sizes:
+                books = make_books(f"{prefix}bulk-{int(ndjson)}-{batch_size}-", args.bulk)
+                elapsed = await bulk(client, books, batch_size, ndjson)
+                label = f"bulk_add {'ndjson' if ndjson else 'json'} {batch_size}"
+                print(f"{label:>22}: {args.bulk / elapsed:9.0f} книг/с ({args.bulk} за {elapsed:.2f} с)")
+    await cleanup(prefix)
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--single", type=int, default=2000, help="книг через add_book")
+    parser.add_argument("--concurrency", type=int, default=10, help="параллельных запросов add_book")
+    parser.add_argument("--bulk", type=int, default=100000, help="книг в одном запросе bulk_add")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with run_server(["-m", "uvicorn", "main:app", "--port", str(args.port)], base_url):
+        asyncio.run(run(base_url, args))
+
+
+
+if __name__ == "__main__":
+    main()
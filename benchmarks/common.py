@@ -0,0 +1,117 @@
+"""Общие помощники бенчмарков: наполнение БД, запуск сервера, токен, курсор, перцентили.
+
+Скрипты, которым нужна БД, берут ее из DATABASE_URL (как и приложение) и ожидают,
+что схема уже на последней версии (python migrate.py).
+"""
+import base64
+
+import os
+
+import subprocess
+
+import sys
+
+import time
+
+from contextlib import contextmanager
+
+from typing import Iterator, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from sqlalchemy import func, select, text
+
+
+
+
+async def seed_books(rows: int) -> None:
+    """Дозаполняет таблицу books сгенерированными книгами до rows строк"""
+    from database.books_db import BookModel
+    from session.session_db import engine, new_session
+
+    async with new_session() as session:
+        existing = (await session.execute(select(func.count()).select_from(BookModel))).scalar()
+        missing = rows - existing
+        if missing > 0:
+            await session.execute(
+                text("INSERT INTO books (title, author) SELECT 'Книга ' || g, 'Автор ' || (g % 1000) FROM generate_series(1, :n) g"),
+                {"n": missing}
+            )
+            await session.commit()
+            # Свежая статистика - планировщик выбирает индексы как в рабочей базе
+            await session.execute(text("ANALYZE books"))
+        print(f"В таблице books {max(existing, rows)} строк (добавлено {max(missing, 0)})")
+    # Соединения пула привязаны к event loop этого asyncio.run
+    await engine.dispose()
+
+
+
+def bench_token(role: str = "admin", user_id: int = 0, username: str = "bench") -> str:
+    """Access-токен, подписанный тем же SECRET_KEY, что и у сервера (берется из окружения)"""
+    from auth.authorization import create_access_token
+
+    return create_access_token({"sub": username, "uid": user_id, "role": role})
+
+
+
+def page_cursor(after_id: int) -> str:
+    """Курсор /books/get_books без фильтров, начинающийся после after_id (формат next_cursor)"""
+    return base64.urlsafe_b64encode(f"|{after_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+
+@contextmanager
+def run_server(
+    args: list[str],
+    base_url: str,
+    env: Optional[dict] = None,
+    ready_path: str = "/ready",
+    timeout: float = 60.0
+) -> Iterator[subprocess.Popen]:
+    """Запускает сервер отдельным процессом и ждет, пока ready_path ответит 200"""
+    process = subprocess.Popen(
+        [sys.executable, *args],
+        cwd=ROOT,
+        # Без файла лога: бенчмарк не оставляет app.log в рабочем каталоге
+        env={**os.environ, "LOG_FILE": "", **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_http(base_url + ready_path, timeout, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+
+def wait_for_http(url: str, timeout: float, process: Optional[subprocess.Popen] = None) -> float:
+    """Опрашивает url до ответа 200; возвращает затраченное время"""
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < timeout:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Сервер завершился с кодом {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - start_time
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} не ответил 200 за {timeout} с")
+
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
@@ -0,0 +1,83 @@
+"""RSS сервера во время потоковой выгрузки /books/export.
+
+Запуск из корня проекта (нужен PostgreSQL из DATABASE_URL):
+    python benchmarks/export_memory.py --rows 1000000 --seed
+
+Сервер запускается отдельным процессом (uvicorn, один воркер), клиент читает ответ
+потоком и выбрасывает его, а RSS процесса сервера снимается каждые --interval секунд.
+Постоянная память означает, что пик RSS почти не отличается от RSS перед выгрузкой.
+"""
+import argparse
+
+import asyncio
+
+import time
+
+import httpx
+
+import psutil
+
+from common import bench_token, percentile, run_server, seed_books
+
+
+
+
+async def sample_rss(process: psutil.Process, interval: float, samples: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        samples.append(process.memory_info().rss / 1024 / 1024)
+        await asyncio.sleep(interval)
+
+
+
+async def export(base_url: str, params: dict, pid: int, interval: float) -> None:
+    process = psutil.Process(pid)
+    rss_before = process.memory_info().rss / 1024 / 1024
+    samples: list[float] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(process, interval, samples, stop))
+
+    received = 0
+    start_time = time.perf_counter()
+    headers = {"Authorization": f"Bearer {bench_token()}"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        async with client.stream("GET", "/books/export", params=params, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw():
+                received += len(chunk)
+    elapsed = time.perf_counter() - start_time
+
+    stop.set()
+    await sampler
+    label = params["format"] + (" gzip" if params["gzip"] == "true" else "")
+    print(
+        f"{label:>11}: {received / 1024 / 1024:8.1f} MB за {elapsed:6.1f} с  "
+        f"RSS до {rss_before:6.1f} MB, p50 {percentile(samples, 50):6.1f}, пик {max(samples):6.1f} MB "
+        f"(+{max(samples) - rss_before:.1f})"
+    )
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", action="store_true", help="дозаполнить books до --rows")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.1, help="период замера RSS, с")
+    args = parser.parse_args()
+
+    if args.seed:
+        asyncio.run(seed_books(args.rows))
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with run_server(["-m", "uvicorn", "main:app", "--port", str(args.port)], base_url) as server:
+        for params in (
+            {"format": "ndjson", "gzip": "false"},
+            {"format": "csv", "gzip": "false"},
+            {"format": "ndjson", "gzip": "true"},
+        ):
+            asyncio.run(export(base_url, params, server.pid, args.interval))
+
+
+
+if __name__ == "__main__":
+    main()
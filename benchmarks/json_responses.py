@@ -0,0 +1,81 @@
+"""Сравнение обычного и быстрого (FAST_JSON_RESPONSES=1) пути ответа для списка книг.
+
+Запуск из корня проекта: python benchmarks/json_responses.py [--rows 10000] [--requests 50]
+
+БД не нужна: оба эндпоинта отдают одну и ту же страницу строк из памяти,
+запросы идут в приложение напрямую через ASGI (httpx.ASGITransport),
+так что разница - только в валидации и сериализации ответа.
+"""
+import argparse
+
+import asyncio
+
+import os
+
+import sys
+
+import time
+
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from fastapi import FastAPI
+
+from schema.book_schema import BooksPageSchema
+
+from endpoints.responses import FastJSONResponse, book_items, orjson
+
+
+
+
+BookRow = namedtuple("BookRow", ["id", "title", "author"])
+
+
+
+def build_app(rows: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default")
+    async def default_path() -> BooksPageSchema:
+        return {"items": rows, "next_cursor": None}
+
+    @app.get("/fast")
+    async def fast_path() -> BooksPageSchema:
+        return FastJSONResponse({"items": book_items(rows), "next_cursor": None})
+
+    return app
+
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> tuple[float, float, int]:
+    # Прогревочный запрос не считаем
+    size = len((await client.get(path)).content)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(requests):
+        response = await client.get(path)
+        response.raise_for_status()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return requests / wall, cpu / requests * 1000, size
+
+
+
+async def main(rows_count: int, requests: int) -> None:
+    rows = [BookRow(i, f"Книга номер {i}", f"Автор {i % 500}") for i in range(1, rows_count + 1)]
+    transport = httpx.ASGITransport(app=build_app(rows))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{rows_count} строк в ответе, {requests} запросов, orjson: {'да' if orjson else 'нет (json)'}")
+        for name, path in (("обычный", "/default"), ("быстрый", "/fast")):
+            rps, cpu_ms, size = await measure(client, path, requests)
+            print(f"{name:>8}: {rps:8.1f} req/s  {cpu_ms:8.2f} ms CPU/запрос  {size} байт")
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.requests))
@@ -0,0 +1,105 @@
+"""Пропускная способность: start_up.py (один процесс uvicorn) против start_up_prod.py (воркеры, uvloop/httptools).
+
+Запуск из корня проекта (нужен PostgreSQL из DATABASE_URL):
+    python benchmarks/launcher_throughput.py [--duration 15] [--client-procs 4] [--concurrency 32]
+
+Нагрузку дают несколько клиентских процессов, чтобы клиент на Python не стал узким местом.
+Смесь запросов: /books/get_book (в основном кэш) и /books/get_books (БД).
+start_up.py слушает 127.0.0.1:8000, поэтому оба варианта меряются на порту 8000.
+"""
+import argparse
+
+import asyncio
+
+import os
+
+import random
+
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from common import bench_token, page_cursor, percentile, run_server, seed_books
+
+
+
+
+BASE_URL = "http://127.0.0.1:8000"
+
+
+
+async def _load(duration: float, concurrency: int, token: str, max_id: int) -> tuple[int, int, list[float]]:
+    deadline = time.perf_counter() + duration
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            if random.random() < 0.5:
+                request = client.get("/books/get_book", params={"id": random.randint(1, 1000)})
+            else:
+                request = client.get("/books/get_books", params={"limit": 20, "cursor": page_cursor(random.randint(0, max_id))})
+            start_time = time.perf_counter()
+            response = await request
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - start_time) * 1000)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=BASE_URL, headers=headers, timeout=30, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return len(latencies), errors, latencies
+
+
+
+def load_process(duration: float, concurrency: int, token: str, max_id: int) -> tuple[int, int, list[float]]:
+    return asyncio.run(_load(duration, concurrency, token, max_id))
+
+
+
+def measure(name: str, args, env: dict) -> None:
+    script = "start_up.py" if name == "start_up.py" else "start_up_prod.py"
+    token = bench_token()
+    with run_server([script], BASE_URL, env=env, timeout=120):
+        with ProcessPoolExecutor(args.client_procs) as pool:
+            futures = [
+                pool.submit(load_process, args.duration, args.concurrency, token, args.rows)
+                for _ in range(args.client_procs)
+            ]
+            results = [future.result() for future in futures]
+
+    ok = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    latencies = [latency for result in results for latency in result[2]]
+    print(
+        f"{name:>26}: {ok / args.duration:8.1f} req/s  p50 {percentile(latencies, 50):6.1f} мс  "
+        f"p99 {percentile(latencies, 99):6.1f} мс  ошибок {errors}"
+    )
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--client-procs", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32, help="соединений на клиентский процесс")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="WEB_CONCURRENCY для start_up_prod.py")
+    parser.add_argument("--rows", type=int, default=10000, help="книг в таблице (дозаполняется)")
+    args = parser.parse_args()
+
+    asyncio.run(seed_books(args.rows))
+    print(f"{args.client_procs} клиентских процессов x {args.concurrency} соединений, {args.duration} с на вариант")
+    # Логи в обоих вариантах одинаково приглушены: меряется запуск, а не логгирование
+    quiet = {"LOG_LEVEL": "WARNING", "LOG_CONSOLE": "0", "LOG_FILE": ""}
+    measure("start_up.py", args, quiet)
+    measure(f"start_up_prod.py x{args.workers}", args, {**quiet, "WEB_CONCURRENCY": str(args.workers), "PORT": "8000"})
+
+
+
+if __name__ == "__main__":
+    main()
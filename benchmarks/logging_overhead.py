@@ -0,0 +1,98 @@
+"""Пропускная способность с логгированием и без: настройки monitoring/log_config.py.
+
+Запуск из корня проекта: python benchmarks/logging_overhead.py [--requests 5000]
+
+БД не нужна: эндпоинт пишет в лог столько же сообщений, сколько обработчики книг
+(принят/выполнен в роутере и CRUD), запросы идут в приложение напрямую через ASGI.
+Каждый вариант - отдельный процесс со своим окружением, потому что настройки
+логгирования читаются при импорте. Время CPU включает фоновый поток записи (enqueue=True).
+"""
+import argparse
+
+import asyncio
+
+import os
+
+import subprocess
+
+import sys
+
+import tempfile
+
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+
+
+# Окружение каждого варианта; файл лога - во временном каталоге
+VARIANTS = {
+    "выключено": {"LOG_LEVEL": "WARNING", "LOG_CONSOLE": "0", "LOG_FILE": ""},
+    "файл": {"LOG_CONSOLE": "0"},
+    "файл+stderr": {"LOG_CONSOLE": "1"},
+    "файл, JSON": {"LOG_CONSOLE": "0", "LOG_JSON": "1"},
+    "файл, 10%": {"LOG_CONSOLE": "0", "LOG_SAMPLE_RATE": "0.1", "LOG_SAMPLED_MODULES": "__main__"},
+}
+
+
+
+async def run(requests: int) -> None:
+    import httpx
+
+    from fastapi import FastAPI
+
+    from loguru import logger
+
+    from monitoring.log_config import setup_logging, shutdown_logging
+
+    setup_logging()
+    app = FastAPI()
+
+    @app.get("/books/get_book")
+    async def get_book(id: int):
+        logger.info("get_book: запрос на получение книги по id принят")
+        logger.info(f"Books.read_book_by_id: Поиск книги с ID {id}")
+        logger.info(f"Books.read_book_by_id: Книга с ID {id} найдена")
+        logger.info("get_book: запрос на получение книги по id выполнен")
+        return {"title": "Книга", "author": "Автор"}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/books/get_book", params={"id": 0})
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        for i in range(requests):
+            response = await client.get("/books/get_book", params={"id": i})
+            response.raise_for_status()
+        # Очередь записи тоже часть цены логгирования
+        await shutdown_logging()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    print(f"{os.environ['BENCH_VARIANT']:>12}: {requests / wall:8.1f} req/s  {cpu / requests * 1000:6.3f} ms CPU/запрос")
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--variant", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        asyncio.run(run(args.requests))
+        return
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, variant_env in VARIANTS.items():
+            env = {**os.environ, "LOG_FILE": os.path.join(log_dir, "bench.log"), **variant_env, "BENCH_VARIANT": name}
+            env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+            # stderr варианта с консолью уходит в /dev/null, чтобы не мерить скорость терминала
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--variant", name, "--requests", str(args.requests)],
+                env=env, stderr=subprocess.DEVNULL, check=True
+            )
+
+
+
+if __name__ == "__main__":
+    main()
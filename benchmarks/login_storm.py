@@ -0,0 +1,121 @@
+"""Задержка чтения книг во время шторма логинов (bcrypt вне event loop).
+
+Запуск из корня проекта (нужен PostgreSQL из DATABASE_URL):
+    python benchmarks/login_storm.py [--duration 10] [--readers 10] [--logins 20]
+
+Сервер - отдельный процесс (uvicorn, один воркер). Сначала только читатели
+/books/get_books со случайным курсором, затем те же читатели вместе с --logins
+параллельными /auth/login. Если хэширование блокировало бы event loop, p99 чтения
+во второй фазе выросла бы до сотен миллисекунд. Хэширование все равно занимает CPU:
+на машине с малым числом ядер часть роста p99 - конкуренция за ядро, ее регулирует --hash-workers.
+"""
+import argparse
+
+import asyncio
+
+import random
+
+import time
+
+import uuid
+
+import httpx
+
+from sqlalchemy import text
+
+from common import bench_token, page_cursor, percentile, run_server, seed_books
+
+
+
+
+async def reader(client: httpx.AsyncClient, deadline: float, latencies: list[float], shed: list[int], max_id: int) -> None:
+    while time.perf_counter() < deadline:
+        start_time = time.perf_counter()
+        response = await client.get("/books/get_books", params={"limit": 20, "cursor": page_cursor(random.randint(0, max_id))})
+        # 503 от контроля допуска - тоже провал чтения, считаем отдельно
+        if response.status_code == 503:
+            shed.append(1)
+            continue
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start_time) * 1000)
+
+
+
+async def login(client: httpx.AsyncClient, deadline: float, credentials: dict, logins: list[float]) -> None:
+    while time.perf_counter() < deadline:
+        start_time = time.perf_counter()
+        response = await client.post("/auth/login", data=credentials)
+        response.raise_for_status()
+        logins.append((time.perf_counter() - start_time) * 1000)
+
+
+
+async def phase(name: str, client: httpx.AsyncClient, args, credentials: dict, with_logins: bool) -> None:
+    deadline = time.perf_counter() + args.duration
+    reads: list[float] = []
+    shed: list[int] = []
+    logins: list[float] = []
+    tasks = [reader(client, deadline, reads, shed, args.rows) for _ in range(args.readers)]
+    if with_logins:
+        tasks += [login(client, deadline, credentials, logins) for _ in range(args.logins)]
+    await asyncio.gather(*tasks)
+
+    line = (
+        f"{name:>16}: чтений {len(reads) / args.duration:7.1f}/с  p50 {percentile(reads, 50):6.1f} мс  "
+        f"p99 {percentile(reads, 99):6.1f} мс  503: {len(shed)}"
+    )
+    if with_logins:
+        line += f"  | логинов {len(logins) / args.duration:5.1f}/с, p99 {percentile(logins, 99):.0f} мс"
+    print(line)
+
+
+
+async def run(base_url: str, args) -> None:
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    credentials = {"username": username, "password": "bench-password"}
+    headers = {"Authorization": f"Bearer {bench_token()}"}
+    limits = httpx.Limits(max_connections=args.readers + args.logins)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=None, limits=limits) as client:
+        response = await client.post(
+            "/auth/register", json={**credentials, "email": f"{username}@example.com"}
+        )
+        response.raise_for_status()
+        try:
+            await phase("только чтение", client, args, credentials, with_logins=False)
+            await phase("чтение + логины", client, args, credentials, with_logins=True)
+        finally:
+            await cleanup(username)
+
+
+
+async def cleanup(username: str) -> None:
+    from session.session_db import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE username = :username"), {"username": username})
+    await engine.dispose()
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность каждой фазы, с")
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=10000, help="книг в таблице (дозаполняется)")
+    parser.add_argument("--hash-workers", type=int, default=None, help="PASSWORD_HASH_WORKERS сервера")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    asyncio.run(seed_books(args.rows))
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {"LOG_LEVEL": "WARNING"}
+    if args.hash_workers:
+        env["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+    with run_server(["-m", "uvicorn", "main:app", "--port", str(args.port)], base_url, env=env):
+        asyncio.run(run(base_url, args))
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Накладные расходы middleware метрик на запрос: прежний @app.middleware("http") против PrometheusMiddleware.
+
+Запуск из корня проекта: python benchmarks/metrics_middleware.py [--requests 3000]
+
+БД не нужна: запросы идут в приложение напрямую через ASGI (httpx.ASGITransport).
+Для каждого варианта - обычный JSON-ответ и потоковый ответ из 100 кусков;
+накладные расходы считаются относительно того же приложения без middleware.
+"""
+import argparse
+
+import asyncio
+
+import os
+
+import sys
+
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from fastapi import FastAPI
+
+from fastapi.responses import StreamingResponse
+
+from loguru import logger
+
+from monitoring.metrics import REQUEST_COUNT, REQUEST_DURATION
+
+from monitoring.middleware import PrometheusMiddleware
+
+
+
+
+async def collect_request_metrics(request, call_next):
+    """Прежний вариант из main.py (BaseHTTPMiddleware), без изменений"""
+    start_time = time.time()
+    method = request.method
+    endpoint = request.url.path
+
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+
+        duration = time.time() - start_time
+        REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
+        REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+
+        logger.debug(f"Request {method} {endpoint} - {status_code} - {duration:.3f}s")
+
+        return response
+
+    except Exception as e:
+        duration = time.time() - start_time
+        REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
+        REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=500).inc()
+
+        logger.error(f"Request {method} {endpoint} failed: {e}")
+        raise e
+
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/books/get_book")
+    async def get_book(id: int):
+        return {"id": id, "title": "Книга", "author": "Автор"}
+
+    async def chunks():
+        for i in range(100):
+            yield f'{{"id": {i}, "title": "Книга", "author": "Автор"}}\n'.encode("utf-8")
+
+    @app.get("/books/export")
+    async def export_books():
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    if variant == "old":
+        app.middleware("http")(collect_request_metrics)
+    elif variant == "new":
+        app.add_middleware(PrometheusMiddleware)
+    return app
+
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> tuple[float, float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        for _ in range(requests):
+            response = await client.get(path)
+            response.raise_for_status()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return requests / wall, cpu / requests * 1_000_000
+
+
+
+async def main(requests: int) -> None:
+    # Логи не меряем: только сами middleware
+    logger.remove()
+    print(f"{requests} запросов на вариант")
+    for path in ("/books/get_book?id=1", "/books/export"):
+        baseline_rps, baseline_cpu = await measure(build_app("none"), path, requests)
+        print(f"{path}")
+        print(f"  {'без middleware':>22}: {baseline_rps:8.1f} req/s  {baseline_cpu:7.1f} мкс CPU/запрос")
+        for variant, name in (("old", "@app.middleware(http)"), ("new", "PrometheusMiddleware")):
+            rps, cpu = await measure(build_app(variant), path, requests)
+            print(f"  {name:>22}: {rps:8.1f} req/s  {cpu:7.1f} мкс CPU/запрос  (+{cpu - baseline_cpu:.1f} мкс)")
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
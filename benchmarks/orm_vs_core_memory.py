@@ -0,0 +1,109 @@
+"""Память при чтении списка книг: ORM-объекты против строк Core на одном и том же наборе колонок.
+
+Запуск из корня проекта (нужен PostgreSQL из DATABASE_URL):
+    python benchmarks/orm_vs_core_memory.py --rows 100000 1000000
+    python benchmarks/orm_vs_core_memory.py --rows 1000000 --seed   # дозаполнить books до 1M строк
+
+Режимы:
+    orm      - select(BookModel).options(load_only(id, title, author))
+    core     - select(id, title, author), как в BooksCRUD.read_books_page
+    orm_full - select(BookModel) со всеми колонками: отдельно показывает вклад лишних колонок
+
+Каждый замер идет в отдельном процессе, чтобы RSS одного пути не влиял на другой.
+tracemalloc peak - пик выделенной Python-памяти за чтение, RSS - прирост максимального RSS процесса.
+"""
+import argparse
+
+import asyncio
+
+import os
+
+import resource
+
+import subprocess
+
+import sys
+
+import time
+
+import tracemalloc
+
+from common import seed_books
+
+from loguru import logger
+
+from sqlalchemy import select, text
+
+from sqlalchemy.orm import load_only
+
+from database.books_db import BookModel
+
+from session.session_db import engine, new_session
+
+
+
+
+MODES = ("orm", "core", "orm_full")
+
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss в Linux - в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+
+async def read(mode: str, rows: int) -> None:
+    columns = (BookModel.id, BookModel.title, BookModel.author)
+    if mode == "orm":
+        query = select(BookModel).options(load_only(*columns))
+    elif mode == "core":
+        query = select(*columns)
+    else:
+        query = select(BookModel)
+    query = query.order_by(BookModel.id).limit(rows)
+
+    async with new_session() as session:
+        # Соединение открывается до замера, чтобы не считать память драйвера
+        await session.execute(text("SELECT 1"))
+        rss_before = _max_rss_mb()
+        tracemalloc.start()
+        start_time = time.perf_counter()
+
+        result = await session.execute(query)
+        books = result.all() if mode == "core" else result.scalars().all()
+
+        elapsed = time.perf_counter() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_delta = _max_rss_mb() - rss_before
+
+    await engine.dispose()
+    print(f"{mode:>8} {len(books):>8} строк: peak {peak / 1024 / 1024:8.1f} MB  RSS +{rss_delta:8.1f} MB  {elapsed:6.2f} с")
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--seed", action="store_true", help="дозаполнить books до максимального --rows")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Предупреждения slow query не мешают таблице результатов
+        logger.remove()
+        asyncio.run(read(args.mode, args.rows[0]))
+        return
+
+    if args.seed:
+        asyncio.run(seed_books(max(args.rows)))
+
+    for rows in args.rows:
+        for mode in MODES:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode, "--rows", str(rows)], check=True)
+
+
+
+if __name__ == "__main__":
+    main()
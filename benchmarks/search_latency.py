@@ -0,0 +1,107 @@
+"""План и задержка /books/search: EXPLAIN (ANALYZE, BUFFERS) и p50/p95/p99 BooksCRUD.search_books.
+
+Запуск из корня проекта (нужен PostgreSQL с pg_trgm из DATABASE_URL):
+    python benchmarks/search_latency.py --rows 1000000 --seed
+
+EXPLAIN строится по тому же SQL и параметрам, которые отправляет search_books
+(перехватываются событием before_cursor_execute), поэтому план - ровно тот, что у эндпоинта.
+В плане должны быть Bitmap Index Scan по ix_books_search_vector и ix_books_title_trgm / ix_books_author_trgm.
+"""
+import argparse
+
+import asyncio
+
+import random
+
+import time
+
+from loguru import logger
+
+from sqlalchemy import event
+
+from common import percentile, seed_books
+
+
+
+
+# Слово целиком, автор, опечатка, несколько слов
+QUERIES = ["Книга {n}", "Автор {a}", "Автр {a}", "Книга {n} Автор {a}", "Кинга {n}"]
+
+
+
+def make_query(template: str) -> str:
+    return template.format(n=random.randint(1, 1000000), a=random.randint(0, 999))
+
+
+
+async def explain(session, crud, q: str) -> None:
+    captured = []
+    sync_engine = session.bind.sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        await crud.search_books(session, q, limit=20)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+    statement, parameters = captured[-1]
+    connection = await session.connection()
+    result = await connection.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+    print(f"\nEXPLAIN для q='{q}':")
+    for (line,) in result:
+        print("  " + line)
+
+
+
+async def run(iterations: int, explain_only: bool) -> None:
+    from CRUD.books import BooksCRUD
+    from session.session_db import engine, new_session
+
+    crud = BooksCRUD()
+    async with new_session() as session:
+        for template in QUERIES:
+            await explain(session, crud, make_query(template))
+        if explain_only:
+            await engine.dispose()
+            return
+
+        # Прогрев: prepared statements и кэш страниц
+        for _ in range(10):
+            await crud.search_books(session, make_query(random.choice(QUERIES)), limit=20)
+
+        latencies = []
+        for _ in range(iterations):
+            q = make_query(random.choice(QUERIES))
+            start_time = time.perf_counter()
+            await crud.search_books(session, q, limit=20)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+    await engine.dispose()
+
+    print(
+        f"\nsearch_books, {iterations} запросов: p50 {percentile(latencies, 50):.1f} мс, "
+        f"p95 {percentile(latencies, 95):.1f} мс, p99 {percentile(latencies, 99):.1f} мс"
+    )
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", action="store_true", help="дозаполнить books до --rows")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--explain-only", action="store_true")
+    args = parser.parse_args()
+
+    # Логи CRUD не меряем
+    logger.remove()
+    if args.seed:
+        asyncio.run(seed_books(args.rows))
+    asyncio.run(run(args.iterations, args.explain_only))
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Время проверки схемы при старте: ensure_schema (версия из schema_migrations) против прежнего create_all.
+
+Запуск из корня проекта (нужен PostgreSQL из DATABASE_URL со схемой последней версии):
+    python benchmarks/startup_time.py [--repeat 20] [--workers 1 8 16]
+
+--workers имитирует одновременный старт N воркеров: у каждого свой движок и свое соединение,
+все проверяют схему одновременно. Дополнительно меряется время от запуска процесса uvicorn
+до первого ответа /livez и до /ready (прогрев пула).
+"""
+import argparse
+
+import asyncio
+
+import statistics
+
+import time
+
+from common import run_server, wait_for_http
+
+
+
+
+async def _create_all(engine) -> None:
+    """Прежний init_db: Base.metadata.create_all на каждом старте воркера"""
+    from session.session_db import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+
+async def _ensure_schema(engine) -> None:
+    from migrations import ensure_schema
+
+    await ensure_schema(engine, auto_migrate=False)
+
+
+
+async def timed_start(check, workers: int) -> float:
+    """Одновременная проверка схемы workers движками; возвращает время самого медленного, мс"""
+    from session.session_db import DATABASE_URL
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engines = [create_async_engine(DATABASE_URL) for _ in range(workers)]
+    try:
+        async def one(engine) -> float:
+            start_time = time.perf_counter()
+            await check(engine)
+            return (time.perf_counter() - start_time) * 1000
+
+        return max(await asyncio.gather(*(one(engine) for engine in engines)))
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+
+
+async def compare(repeat: int, workers_list: list[int]) -> None:
+    # Модели регистрируются в Base.metadata при импорте
+    import database.books_db  # noqa: F401
+    import database.users_db  # noqa: F401
+    from loguru import logger
+
+    logger.remove()
+    for workers in workers_list:
+        for name, check in (("create_all", _create_all), ("ensure_schema", _ensure_schema)):
+            timings = [await timed_start(check, workers) for _ in range(repeat)]
+            print(
+                f"{name:>13} x{workers:<3}: медиана {statistics.median(timings):7.1f} мс  "
+                f"макс {max(timings):7.1f} мс"
+            )
+
+
+
+def process_startup(port: int) -> None:
+    base_url = f"http://127.0.0.1:{port}"
+    start_time = time.perf_counter()
+    with run_server(["-m", "uvicorn", "main:app", "--port", str(port)], base_url, ready_path="/livez") as server:
+        live = time.perf_counter() - start_time
+        wait_for_http(base_url + "/ready", 60, server)
+        ready = time.perf_counter() - start_time
+    print(f"uvicorn main:app: /livez через {live:.2f} с, /ready через {ready:.2f} с после запуска процесса")
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 16])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    asyncio.run(compare(args.repeat, args.workers))
+    process_startup(args.port)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from .ttl_cache import TTLCache
+
+__all__ = ['TTLCache']
@@ -0,0 +1,131 @@
+import time
+
+from collections import OrderedDict
+
+from typing import Any, Callable, Hashable, Optional
+
+from monitoring.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES, CACHE_SIZE
+
+
+
+
+class TTLCache:
+    """Ограниченный по размеру (LRU) и времени жизни (TTL) кэш в памяти процесса.
+
+    Работает внутри одного event loop, поэтому блокировки не нужны.
+    Счетчики попаданий/промахов/вытеснений экспортируются в Prometheus с меткой cache=name.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # Растет при каждой инвалидации: чтение, начатое до записи, не положит в кэш старое значение
+        self._version = 0
+        # Ключи, которые после инвалидации временно не кэшируются (чтение с отстающей реплики)
+        self._holds: dict[Hashable, float] = {}
+
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+        self._size = CACHE_SIZE.labels(cache=name)
+
+
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение или None, если записи нет или она устарела"""
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses.inc()
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key, reason="expired")
+            self._misses.inc()
+            return None
+
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+
+
+    @property
+    def version(self) -> int:
+        """Запоминается перед чтением из БД и передается в set()"""
+        return self._version
+
+
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        version: Optional[int] = None
+    ) -> None:
+        """Кладет значение; ttl можно сократить для отдельной записи"""
+        if self.maxsize <= 0:
+            return
+        if version is not None and version != self._version:
+            # Между чтением и записью в кэш была инвалидация - значение могло устареть
+            return
+        if self._holds:
+            hold_until = self._holds.get(key)
+            if hold_until is not None:
+                if hold_until > time.monotonic():
+                    return
+                del self._holds[key]
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._remove(oldest, reason="size")
+        self._size.set(len(self._data))
+
+
+
+    def invalidate(self, key: Hashable, hold: float = 0) -> None:
+        """Удаляет запись после изменения данных; hold - сколько секунд не кэшировать ключ заново"""
+        self._version += 1
+        if hold > 0:
+            self._prune_holds()
+            self._holds[key] = time.monotonic() + hold
+        if key in self._data:
+            self._remove(key, reason="invalidated")
+
+
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Удаляет все записи, значения которых подходят под условие (для редких операций записи)"""
+        self._version += 1
+        for key in [k for k, (_, value) in self._data.items() if predicate(value)]:
+            self._remove(key, reason="invalidated")
+
+
+
+    def _prune_holds(self) -> None:
+        if len(self._holds) >= self.maxsize:
+            now = time.monotonic()
+            self._holds = {k: until for k, until in self._holds.items() if until > now}
+
+
+
+    def clear(self) -> None:
+        self._version += 1
+        self._data.clear()
+        self._size.set(0)
+
+
+
+    def _remove(self, key: Hashable, reason: str) -> None:
+        del self._data[key]
+        CACHE_EVICTIONS.labels(cache=self.name, reason=reason).inc()
+        self._size.set(len(self._data))
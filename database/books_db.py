@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Mapped, mapped_column
 
-from sqlalchemy import Identity
+from sqlalchemy import Computed, DateTime, Identity, Index, func, text
+
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from session.session_db import  Base
 
@@ -12,4 +16,41 @@ class BookModel(Base):
     id: Mapped[int] = mapped_column(Identity(start=1, cycle=True),primary_key=True)
     title: Mapped[str] = mapped_column(nullable=False)
     author: Mapped[str] = mapped_column(nullable=False)
+    # Вектор для полнотекстового поиска, PostgreSQL пересчитывает его сам; в обычных запросах не загружается.
+    # В существующие базы колонку и индексы добавляет миграция v0002 (create_all старые таблицы не меняет)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(author, ''))", persisted=True),
+        deferred=True,
+    )
+    # Время создания/изменения проставляет PostgreSQL; updated_at обновляет BooksCRUD.update_book
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Индексы под keyset-пагинацию с фильтром по префиксу: порядок (ключ в collation "C", id)
+    # совпадает с порядком страниц BooksCRUD.read_books_page, префикс - диапазон этого же индекса
+    __table_args__ = (
+        Index("ix_books_author_keyset", text('author COLLATE "C"'), "id"),
+        Index("ix_books_title_keyset", text('title COLLATE "C"'), "id"),
+        # Индексы для /books/search: полнотекстовый и триграммные (расширение pg_trgm)
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_books_author_trgm", "author", postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}),
+        # Keyset по (updated_at, id) для /books/changes
+        Index("ix_books_updated_at_id", "updated_at", "id"),
+    )
+
+
+
+class BookTombstoneModel(Base):
+    """След удаленной книги: по нему /books/changes сообщает клиентам об удалении"""
+    __tablename__ = "book_tombstones"
+
+    id: Mapped[int] = mapped_column(Identity(start=1), primary_key=True)
+    book_id: Mapped[int] = mapped_column(nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_book_tombstones_deleted_at_book_id", "deleted_at", "book_id"),
+    )
 
@@ -1,28 +1,37 @@
-from fastapi import FastAPI, HTTPException, APIRouter, Depends
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Query, Request
 
-from schema.book_schema import BookSchema, BooklIdShcema 
+from fastapi.responses import StreamingResponse
 
-from session.session_db import SessionDep
+from schema.book_schema import BookSchema, BooksPageSchema, BooksSearchPageSchema, BulkAddResultSchema, BookChangesPageSchema
 
-from auth.authentication import get_current_user
+from typing import Any, AsyncIterator, Literal, Optional
 
-from database.users_db import UserModel
+import base64
 
-from loguru import logger
+import csv
 
-from CRUD.books import BooksCRUD
+import io
+
+import json
+
+import zlib
+
+from datetime import datetime
+
+from session.session_db import SessionDep, ReadSessionDep, new_read_session, admission_controller
 
+from session.admission import route_priority
 
+from auth.authentication import get_current_principal
+
+from schema.user_schema import Principal
+
+from loguru import logger
+
+from CRUD.books import BooksCRUD
 
+from endpoints.responses import FAST_JSON_RESPONSES, FastJSONResponse, book_items
 
-logger.add(
-    "app.log",
-    rotation="10 MB",
-    retention="30 days",
-    level="INFO",
-    backtrace=True,
-    diagnose=True
-)
 
 
 
@@ -35,7 +44,7 @@ book_crud = BooksCRUD()
 async def add_book(
         data: BookSchema,
         session: SessionDep,
-        current_user: UserModel = Depends(get_current_user)
+        current_user: Principal = Depends(get_current_principal)
     ):
     """Добавить книги"""
     try:
@@ -50,19 +59,103 @@ async def add_book(
 
 
 
-@router.get("/get_books", summary= "Получить все книги")
-async def get_books(
+async def _iter_json_array(request: Request) -> AsyncIterator[Any]:
+    try:
+        items = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Некорректный JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Ожидается JSON-массив книг")
+    for item in items:
+        yield item
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Any]:
+    """Построчный разбор NDJSON по мере поступления тела запроса"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_ndjson_line(line)
+    if buffer.strip():
+        yield _parse_ndjson_line(buffer)
+
+
+def _parse_ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        # Невалидная строка не прерывает импорт: ее пачка будет отмечена как failed
+        return line.decode("utf-8", errors="replace")
+
+
+
+@router.post("/bulk_add", summary="Массово добавить книги (JSON-массив или NDJSON)")
+async def bulk_add_books(
+        request: Request,
         session: SessionDep,
-        current_user: UserModel = Depends(get_current_user)
-    ) -> list[BooklIdShcema]:
+        batch_size: int = Query(500, ge=1, le=5000, description="Количество книг в одной пачке"),
+        current_user: Principal = Depends(get_current_principal)
+    ) -> BulkAddResultSchema:
+    """Массовое добавление книг с отчетом по каждой пачке"""
     try:
-        logger.info("get_books: запрос получение всех книг принят")
-        books = await book_crud.read_all_books(session)
-        
-        if not books:
-            raise HTTPException(status_code=404, detail="Книги не найдены")
-        logger.info("get_books: запрос на все книги выполнен")
-        return books
+        content_type = request.headers.get("content-type", "")
+        logger.info(f"bulk_add_books: запрос на массовое добавление принят, {content_type}")
+
+        if "ndjson" in content_type:
+            items = _iter_ndjson(request)
+        else:
+            items = _iter_json_array(request)
+
+        result = await book_crud.bulk_create(session, items, batch_size)
+        logger.info("bulk_add_books: запрос на массовое добавление выполнен")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"bulk_add_books произошла ошибка {e}")
+        raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
+
+
+
+def _encode_page_cursor(position: tuple[str, int]) -> str:
+    """Непрозрачный для клиента курсор страницы: позиция (ключ сортировки, id) в base64"""
+    key, book_id = position
+    raw = f"{key}|{book_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_page_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        key, book_id = raw.rsplit("|", 1)
+        return key, int(book_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Некорректный курсор")
+
+
+
+@router.get("/get_books", summary= "Получить книги постранично")
+async def get_books(
+        session: ReadSessionDep,
+        limit: int = Query(50, ge=1, le=500, description="Размер страницы"),
+        cursor: Optional[str] = Query(None, description="Курсор: next_cursor предыдущей страницы с теми же фильтрами"),
+        author: Optional[str] = Query(None, description="Фильтр по началу имени автора"),
+        title: Optional[str] = Query(None, description="Фильтр по началу названия"),
+        current_user: Principal = Depends(get_current_principal)
+    ) -> BooksPageSchema:
+    try:
+        logger.info("get_books: запрос получение страницы книг принят")
+        after = _decode_page_cursor(cursor) if cursor is not None else None
+        books, next_after = await book_crud.read_books_page(session, limit, after, author, title)
+        # Пустая страница - обычный ответ списка, а не 404
+        next_cursor = _encode_page_cursor(next_after) if next_after is not None else None
+        logger.info("get_books: запрос на страницу книг выполнен")
+        if FAST_JSON_RESPONSES:
+            return FastJSONResponse({"items": book_items(books), "next_cursor": next_cursor})
+        return {"items": books, "next_cursor": next_cursor}
     except HTTPException:
         raise
     except Exception as e:
@@ -71,16 +164,88 @@ async def get_books(
     
         
 
+@router.get("/search", summary="Поиск книг по названию и автору")
+async def search_books(
+        session: ReadSessionDep,
+        q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос"),
+        limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+        offset: int = Query(0, ge=0, le=10000, description="Смещение: next_offset предыдущей страницы"),
+        current_user: Principal = Depends(get_current_principal)
+    ) -> BooksSearchPageSchema:
+    try:
+        logger.info("search_books: запрос на поиск книг принят")
+        books, next_offset = await book_crud.search_books(session, q, limit, offset)
+        logger.info("search_books: запрос на поиск книг выполнен")
+        if FAST_JSON_RESPONSES:
+            items = [{"id": row.id, "title": row.title, "author": row.author, "score": row.score} for row in books]
+            return FastJSONResponse({"items": items, "next_offset": next_offset})
+        return {"items": books, "next_offset": next_offset}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"search_books произошла ошибка {e}")
+        raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
+
+
+
+def _encode_changes_cursor(changed_at: datetime, book_id: int) -> str:
+    """Непрозрачный для клиента курсор: позиция (changed_at, id) в base64"""
+    raw = f"{changed_at.isoformat()}|{book_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_changes_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        changed_at, book_id = raw.rsplit("|", 1)
+        position = (datetime.fromisoformat(changed_at), int(book_id))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Некорректный курсор")
+    if position[0].tzinfo is None:
+        raise HTTPException(status_code=422, detail="Некорректный курсор")
+    return position
+
+
+
+@router.get("/changes", summary="Изменения книг после курсора (синхронизация)")
+async def get_changes(
+        session: SessionDep,
+        since: Optional[str] = Query(None, description="Курсор: next_cursor предыдущего ответа; без него - с самого начала"),
+        limit: int = Query(500, ge=1, le=5000, description="Размер страницы"),
+        current_user: Principal = Depends(get_current_principal)
+    ) -> BookChangesPageSchema:
+    """Обновленные и удаленные книги после курсора; объем ответа зависит от числа изменений, а не от размера каталога"""
+    # Лента читается с primary: на отстающей реплике курсор мог бы перескочить еще не доехавшие изменения
+    try:
+        logger.info("get_changes: запрос на получение изменений книг принят")
+        after = _decode_changes_cursor(since) if since else None
+        changes, has_more = await book_crud.read_changes(session, limit, after)
+
+        # Пустая страница возвращает тот же курсор - клиент сохраняет его до следующей синхронизации
+        next_cursor = _encode_changes_cursor(changes[-1].changed_at, changes[-1].id) if changes else since
+        logger.info("get_changes: запрос на получение изменений книг выполнен")
+        return {"items": changes, "next_cursor": next_cursor, "has_more": has_more}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"get_changes произошла ошибка {e}")
+        raise HTTPException(status_code=500, detail=f"Внутренняя ошибка сервера: {str(e)}")
+
+
+
 @router.get("/get_book",response_model= BookSchema, summary= "Получить книгу по id")
 async def get_book(
-        session: SessionDep,
+        session: ReadSessionDep,
         id: int,
-        current_user: UserModel = Depends(get_current_user)
+        current_user: Principal = Depends(get_current_principal)
     ):
     try:
         logger.info("get_book: запрос на получение книги по id принят")
         book = await book_crud.read_book_by_id(session, id)
         logger.info("get_book: запрос на получение книги по id выполнен")
+        if FAST_JSON_RESPONSES:
+            # Та же форма, что у response_model=BookSchema
+            return FastJSONResponse({"title": book.title, "author": book.author})
         return book
     except HTTPException:
         raise
@@ -90,12 +255,92 @@ async def get_book(
     
 
 
+# Размер пачки строк, которую серверный курсор отдает за один fetch
+EXPORT_BATCH_SIZE = 1000
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(
+        json.dumps({"id": row.id, "title": row.title, "author": row.author}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def _export_books(export_format: str, compress: bool) -> AsyncIterator[bytes]:
+    """Генератор выгрузки: в памяти держится только одна пачка строк"""
+    encode = _encode_csv if export_format == "csv" else _encode_ndjson
+    # wbits=31 - формат gzip (заголовок + crc), а не голый deflate
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def pack(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    # Слот допуска уже взят в export_books; освобождается, когда выгрузка закончилась или прервана
+    try:
+        # Пустой первый кусок: export_books сразу заходит в try, и слот вернется,
+        # даже если тело ответа так и не начнут читать
+        yield b""
+
+        # Сессия открывается внутри генератора: зависимости с yield закрываются
+        # до начала отправки тела ответа
+        async with new_read_session() as session:
+            if export_format == "csv":
+                yield pack("id,title,author\r\n")
+            async for rows in book_crud.stream_books(session, EXPORT_BATCH_SIZE):
+                chunk = pack(encode(rows))
+                if chunk:
+                    yield chunk
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        admission_controller.release()
+
+
+
+@router.get("/export", summary="Выгрузить все книги (NDJSON/CSV)")
+async def export_books(
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    gzip: bool = Query(False, description="Сжать выгрузку в gzip"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Потоковая выгрузка таблицы книг с постоянным потреблением памяти"""
+    logger.info(f"export_books: запрос на выгрузку книг принят, формат {export_format}")
+
+    filename = f"books.{export_format}"
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    # Выгрузка не использует SessionDep, поэтому проходит контроль допуска сама:
+    # при перегрузке 503 отдается до заголовков ответа, а не обрывом потока
+    await admission_controller.acquire(route_priority(request))
+    body = _export_books(export_format, gzip)
+    await anext(body)
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+
 @router.put("/update_book/{book_id}", summary="Обновить книгу")
 async def update_book(
     book_id: int,
     data: BookSchema,
     session: SessionDep,
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Обновить книгу"""
     try:
@@ -115,7 +360,7 @@ async def update_book(
 async def delete_book(
     book_id: int,
     session: SessionDep,
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Удалить книгу"""
     try:
@@ -0,0 +1,80 @@
+from fastapi import APIRouter
+
+from fastapi.responses import JSONResponse
+
+import os
+
+from session.session_db import engine, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+from session.warmup import is_ready
+
+from monitoring.probes import HealthProbe
+
+
+
+
+# Пробы без авторизации и без обращения к БД в запросе: отвечают из состояния HealthProbe
+HEALTH_TICK_INTERVAL_SECONDS = float(os.getenv("HEALTH_TICK_INTERVAL_SECONDS", "0.5"))
+HEALTH_DB_PING_INTERVAL_SECONDS = float(os.getenv("HEALTH_DB_PING_INTERVAL_SECONDS", "5"))
+HEALTH_DB_PING_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_PING_TIMEOUT_SECONDS", "2"))
+# Задержка event loop, после которой воркер считается зависшим (livez) / перегруженным (readyz)
+LIVEZ_MAX_LOOP_LAG_SECONDS = float(os.getenv("LIVEZ_MAX_LOOP_LAG_SECONDS", "5"))
+READYZ_MAX_LOOP_LAG_SECONDS = float(os.getenv("READYZ_MAX_LOOP_LAG_SECONDS", "1"))
+
+health_probe = HealthProbe(
+    engine,
+    DB_POOL_SIZE + DB_MAX_OVERFLOW,
+    HEALTH_TICK_INTERVAL_SECONDS,
+    HEALTH_DB_PING_INTERVAL_SECONDS,
+    HEALTH_DB_PING_TIMEOUT_SECONDS,
+)
+
+
+router = APIRouter(tags=["HEALTH CHECK 💊"])
+
+
+
+@router.get("/ready", summary="Готовность принимать трафик")
+async def ready():
+    """Для балансировщика: 200 только после прогрева пула соединений"""
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
+
+@router.get("/livez", summary="Проба живости процесса")
+async def livez():
+    """Живость: тикер event loop просыпается вовремя"""
+    # Тикер, который давно не просыпался, значит, что loop заблокирован
+    lag = max(health_probe.loop_lag, health_probe.heartbeat_age() - HEALTH_TICK_INTERVAL_SECONDS)
+    body = {"status": "ok", "loop_lag_ms": round(lag * 1000, 1)}
+    if lag > LIVEZ_MAX_LOOP_LAG_SECONDS:
+        body["status"] = "stalled"
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+
+@router.get("/readyz", summary="Проба готовности (кэшированный пинг БД)")
+async def readyz():
+    """Готовность: прогрев завершен, последний пинг БД успешен и свеж, loop не перегружен"""
+    ping_age = health_probe.db_ping_age()
+    checks = {
+        "warm_up": is_ready(),
+        # Пинг старше трех интервалов - фоновая проверка сама зависла
+        "database": health_probe.db_ok and ping_age is not None and ping_age < 3 * HEALTH_DB_PING_INTERVAL_SECONDS,
+        "event_loop": health_probe.loop_lag <= READYZ_MAX_LOOP_LAG_SECONDS,
+    }
+    body = {
+        "status": "ready" if all(checks.values()) else "not_ready",
+        "checks": checks,
+        "db_ping_age_s": round(ping_age, 2) if ping_age is not None else None,
+        "db_error": health_probe.db_error,
+        "loop_lag_ms": round(health_probe.loop_lag * 1000, 1),
+        # Исчерпанный пул - временная перегрузка, ее разгребает admission control, а не вывод пода из балансировки
+        "pool": health_probe.pool_status(),
+    }
+    if not all(checks.values()):
+        return JSONResponse(status_code=503, content=body)
+    return body
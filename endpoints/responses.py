@@ -0,0 +1,39 @@
+import json
+
+import os
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него тот же ответ собирается стандартным json
+    orjson = None
+
+
+
+
+# Быстрый путь ответов: без повторной валидации через Pydantic, сериализация сразу из строк БД
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "0") == "1"
+
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ через orjson (если установлен); содержимое должно быть уже из простых типов"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+
+def book_items(rows) -> list[dict]:
+    """Строки книг (Row или ORM-объекты) в словари для ответа"""
+    return [{"id": row.id, "title": row.title, "author": row.author} for row in rows]
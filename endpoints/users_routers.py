@@ -1,30 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 
 from fastapi.security import OAuth2PasswordRequestForm
 
-from schema.user_schema import UserSchema, UserOut, Token
+from schema.user_schema import UserSchema, UserOut, Token, RefreshRequest, Principal
 
-from session.session_db import SessionDep
+from session.session_db import SessionDep, ReadSessionDep, admitted_session
 
-from auth.authentication import get_current_user, require_admin
+from session.admission import route_priority
+
+from auth.authentication import get_current_user, get_current_principal, require_admin, require_admin_db
 
 from database.users_db import UserModel
 
-from auth.authorization import authenticate_user, create_access_token
+from auth.authorization import create_token_pair, decode_token, get_password_hash_async, get_user_by_id, get_user_by_username, verify_password_async
 
 from CRUD.users import UsersCRUD
 
 from loguru import logger
 
 
-logger.add(
-    "app.log",
-    rotation="10 MB",
-    retention="30 days",
-    level="INFO",
-    backtrace=True,
-    diagnose=True
-)
 
 
 router = APIRouter(prefix="/auth", tags=["РАБОТА С ПОЛЬЗОВАТЕЛЯМИ 👨‍💻"])
@@ -34,9 +28,12 @@ user_crud = UsersCRUD()
 
 
 @router.post("/register", response_model=UserOut, tags =["CRUD"], summary = "регистрация")
-async def register(user: UserSchema, session: SessionDep):
+async def register(request: Request, user: UserSchema):
     """Регистрация нового пользователя"""
-    return await user_crud.create_user(session, user)
+    # Как в login: bcrypt идет до слота допуска и транзакции, слот нужен только на проверки и вставку
+    hashed_password = await get_password_hash_async(user.password)
+    async with admitted_session(route_priority(request)) as session:
+        return await user_crud.create_user(session, user, hashed_password)
 
 
 
@@ -44,7 +41,7 @@ async def register(user: UserSchema, session: SessionDep):
 async def delete_user_by_id(
     user_id: int,
     session: SessionDep,
-    current_user: UserModel = Depends(require_admin)
+    current_user: UserModel = Depends(require_admin_db)
 ):
     try:
         logger.info(f"delete_user_by_id: запрос на удаление пользователя {user_id}  принят")
@@ -65,7 +62,7 @@ async def update_user_by_id(
     user_id: int,
     session: SessionDep,
     data: UserSchema,
-    current_user: UserModel = Depends(require_admin)
+    current_user: UserModel = Depends(require_admin_db)
 ):
     try:
         logger.info("update_user_by_id: запрос на обновление пользователя принят")
@@ -87,9 +84,9 @@ async def update_user_by_id(
 
 @router.get("/get_user",response_model= UserSchema, tags =["CRUD"], summary = "Получить пользователя по id" )
 async def get_user(
-    session: SessionDep,
+    session: ReadSessionDep,
     id: int,
-    current_user: UserModel = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     try:
         logger.info("get_user: запрос на получение пользователя принят")
@@ -107,8 +104,8 @@ async def get_user(
 
 @router.get("/get_all_users", tags =["CRUD"], summary = "Получить всех пользователей")
 async def get_users(
-    session: SessionDep,
-    current_user: UserModel = Depends(require_admin)
+    session: ReadSessionDep,
+    current_user: Principal = Depends(require_admin)
 ) -> list[UserSchema]:
     try:
         logger.info("get_users: запрос на получение всех пользователей принят")
@@ -128,20 +125,40 @@ async def get_users(
 
 @router.post("/login", response_model=Token,  tags =["AUTH"], summary = "логгирование" )
 async def login(
-    session: SessionDep,
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """Вход и получение токена"""
-    user = await authenticate_user(session, form_data.username, form_data.password)
-    if not user:
+    # Слот допуска и соединение нужны только на поиск пользователя: проверка bcrypt
+    # идет уже без них, иначе шторм логинов занял бы все слоты и вытеснил чтения
+    async with admitted_session(route_priority(request)) as session:
+        user = await get_user_by_username(session, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return create_token_pair(user)
+
+
+
+@router.post("/refresh", response_model=Token, tags =["AUTH"], summary = "обновление токена")
+async def refresh(
+    data: RefreshRequest,
+    session: SessionDep
+):
+    """Выдает новую пару токенов по refresh-токену; роль перечитывается из БД"""
+    payload = decode_token(data.refresh_token, "refresh")
+    user = await get_user_by_id(session, payload.get("uid"))
+    if user is None or user.username != payload["sub"]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return create_token_pair(user)
 
 
 
@@ -163,7 +180,7 @@ async def protected_route(current_user: UserModel = Depends(get_current_user)):
 
 
 @router.get("/role",  tags =["AUTH"], summary = "текущая роль пользователя")
-async def get_role(current_user: UserModel = Depends(get_current_user)):
+async def get_role(current_user: Principal = Depends(get_current_principal)):
     return {
         "role": current_user.role
     }
\ No newline at end of file
@@ -0,0 +1,21 @@
+import asyncio
+
+from migrations import migrate
+
+from session.session_db import engine
+
+
+
+# Применение миграций отдельно от запуска приложения, перед каждым деплоем:
+# python migrate.py, затем python start_up.py / start_up_prod.py
+
+
+async def main():
+    try:
+        await migrate(engine)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
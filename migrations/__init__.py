@@ -0,0 +1,3 @@
+from .runner import LATEST_VERSION, current_version, ensure_schema, migrate
+
+__all__ = ['LATEST_VERSION', 'current_version', 'ensure_schema', 'migrate']
@@ -0,0 +1,116 @@
+from loguru import logger
+
+from sqlalchemy import text
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from migrations.versions import (
+    v0001_initial, v0002_books_listing_and_search, v0003_books_change_feed, v0004_books_keyset_indexes,
+)
+
+
+
+
+# Миграции применяются строго по возрастанию VERSION; новая миграция - новый модуль в versions/.
+# У модуля:
+#   STATEMENTS   - DDL в одной транзакции (идемпотентный: IF NOT EXISTS, повтор после сбоя безопасен);
+#   INDEXES      - необязательно, [(имя, "таблица (колонки)")]: строятся CREATE INDEX CONCURRENTLY
+#                  после транзакции, без блокировки записи в таблицу на время построения;
+#   DROP_INDEXES - необязательно, имена индексов для DROP INDEX CONCURRENTLY после построения новых.
+MIGRATIONS = sorted(
+    [v0001_initial, v0002_books_listing_and_search, v0003_books_change_feed, v0004_books_keyset_indexes],
+    key=lambda migration: migration.VERSION,
+)
+
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+# Ключ advisory lock: процессы, запустившие миграции одновременно, применяют их по очереди
+MIGRATION_LOCK_KEY = 727_001
+
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    """Версия схемы в БД; 0 - миграции еще ни разу не применялись"""
+    table = await conn.execute(text("SELECT to_regclass('schema_migrations')"))
+    if table.scalar() is None:
+        return 0
+    result = await conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_migrations"))
+    return result.scalar()
+
+
+
+async def _create_index_concurrently(conn: AsyncConnection, name: str, definition: str) -> None:
+    """CREATE INDEX CONCURRENTLY; недостроенный (INVALID) индекс прошлого сбоя сначала удаляется"""
+    result = await conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name}
+    )
+    if result.scalar() is False:
+        logger.warning(f"migrate: индекс {name} не достроен прошлым запуском, строится заново")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
+
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """Применяет недостающие миграции; возвращает итоговую версию.
+
+    Вызывается из migrate.py до деплоя: построение индексов на больших таблицах занимает минуты.
+    """
+    # CONCURRENTLY не работает внутри транзакции: служебное соединение в autocommit держит
+    # сессионный advisory lock, DDL каждой миграции идет отдельной транзакцией
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            await lock_conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description VARCHAR NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+
+            # Версию перечитываем под блокировкой: другой процесс мог уже все применить
+            version = await current_version(lock_conn)
+            for migration in MIGRATIONS:
+                if migration.VERSION <= version:
+                    continue
+                logger.info(f"migrate: применение миграции {migration.VERSION} - {migration.DESCRIPTION}")
+                async with engine.begin() as conn:
+                    for statement in migration.STATEMENTS:
+                        await conn.execute(text(statement))
+                for name, definition in getattr(migration, "INDEXES", []):
+                    await _create_index_concurrently(lock_conn, name, definition)
+                for name in getattr(migration, "DROP_INDEXES", []):
+                    await lock_conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                # Версия фиксируется последней: после сбоя миграция повторяется целиком
+                await lock_conn.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                    {"version": migration.VERSION, "description": migration.DESCRIPTION}
+                )
+                version = migration.VERSION
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+    logger.info(f"migrate: версия схемы {version}")
+    return version
+
+
+
+async def ensure_schema(engine: AsyncEngine, auto_migrate: bool) -> None:
+    """Проверка при старте: если схема актуальна, никакого DDL и блокировок"""
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+
+    if version == LATEST_VERSION:
+        logger.info(f"Схема БД актуальна (версия {version}), миграции не нужны")
+        return
+    if version > LATEST_VERSION:
+        logger.warning(f"Версия схемы БД {version} новее кода ({LATEST_VERSION})")
+        return
+    if not auto_migrate:
+        raise RuntimeError(
+            f"Схема БД устарела (версия {version}, нужна {LATEST_VERSION}): выполните python migrate.py"
+        )
+    await migrate(engine)
@@ -0,0 +1,24 @@
+# Исходные таблицы - в том виде, в каком их создавал Base.metadata.create_all.
+# IF NOT EXISTS: в уже работающих базах таблицы есть, миграция только фиксирует версию.
+
+VERSION = 1
+DESCRIPTION = "books and users tables"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER GENERATED BY DEFAULT AS IDENTITY (START WITH 1 CYCLE) PRIMARY KEY,
+        title VARCHAR NOT NULL,
+        author VARCHAR NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER GENERATED BY DEFAULT AS IDENTITY (START WITH 1 CYCLE) PRIMARY KEY,
+        email VARCHAR NOT NULL UNIQUE,
+        username VARCHAR NOT NULL UNIQUE,
+        password VARCHAR NOT NULL,
+        role VARCHAR NOT NULL
+    )
+    """,
+]
@@ -0,0 +1,22 @@
+# Индексы для keyset-пагинации с фильтром по префиксу и для /books/search.
+# Поиск по users идет по username/email/id - их покрывают UNIQUE и PRIMARY KEY из v0001.
+# ADD COLUMN ... STORED переписывает таблицу books под ACCESS EXCLUSIVE: на большой базе - в окно обслуживания.
+
+VERSION = 2
+DESCRIPTION = "books prefix, full-text and trigram indexes"
+
+STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(author, ''))) STORED
+    """,
+]
+
+INDEXES = [
+    ("ix_books_author_prefix", "books (author varchar_pattern_ops, id)"),
+    ("ix_books_title_prefix", "books (title varchar_pattern_ops, id)"),
+    ("ix_books_search_vector", "books USING gin (search_vector)"),
+    ("ix_books_title_trgm", "books USING gin (title gin_trgm_ops)"),
+    ("ix_books_author_trgm", "books USING gin (author gin_trgm_ops)"),
+]
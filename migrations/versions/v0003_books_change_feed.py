@@ -0,0 +1,22 @@
+# Отметки времени книг и следы удалений для /books/changes.
+# ADD COLUMN с DEFAULT now() не переписывает таблицу: существующие строки получают время миграции.
+
+VERSION = 3
+DESCRIPTION = "books timestamps and deletion tombstones"
+
+STATEMENTS = [
+    "ALTER TABLE books ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "ALTER TABLE books ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    """
+    CREATE TABLE IF NOT EXISTS book_tombstones (
+        id INTEGER GENERATED BY DEFAULT AS IDENTITY (START WITH 1) PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_book_tombstones_deleted_at_book_id ON book_tombstones (deleted_at, book_id)",
+]
+
+INDEXES = [
+    ("ix_books_updated_at_id", "books (updated_at, id)"),
+]
@@ -0,0 +1,15 @@
+# Индексы varchar_pattern_ops из v0002 находят префикс, но не отдают строки в порядке страницы:
+# каждая страница с фильтром сортировала все совпадения. Keyset по (ключ COLLATE "C", id) читает
+# из индекса только саму страницу.
+
+VERSION = 4
+DESCRIPTION = "books keyset indexes for prefix-filtered pages"
+
+STATEMENTS = []
+
+INDEXES = [
+    ("ix_books_author_keyset", 'books ((author COLLATE "C"), id)'),
+    ("ix_books_title_keyset", 'books ((title COLLATE "C"), id)'),
+]
+
+DROP_INDEXES = ["ix_books_author_prefix", "ix_books_title_prefix"]
@@ -0,0 +1,170 @@
+import asyncio
+
+import psutil
+
+from typing import Optional
+
+from loguru import logger
+
+from sqlalchemy import text
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import time
+
+from monitoring.metrics import (
+    CPU_USAGE, MEMORY_USAGE, DISK_USAGE,
+    DATABASE_SIZE, ACTIVE_CONNECTIONS,
+)
+
+from monitoring.counters import RowCounter, books_counter, users_counter
+
+from monitoring.multiprocess import cleanup_dead_workers
+
+
+
+
+# Функции для метрик
+def update_system_metrics():
+    """Обновление системных метрик с обработкой ошибок"""
+    try:
+        logger.debug("Updating system metrics...")
+        # CPU метрика: interval=None не блокирует, а считает загрузку с прошлого вызова
+        cpu_percent = psutil.cpu_percent(interval=None)
+        CPU_USAGE.set(cpu_percent)
+
+        # Memory метрика
+        memory = psutil.virtual_memory()
+        memory_used_mb = memory.used / 1024 / 1024
+        MEMORY_USAGE.set(memory_used_mb)
+
+        # Disk метрика
+        disk = psutil.disk_usage('/')
+        DISK_USAGE.set(disk.percent)
+        logger.debug(f"System metrics updated - CPU: {cpu_percent}%, Memory: {memory_used_mb:.2f}MB")
+
+    except Exception as e:
+        logger.error(f"Error updating system metrics: {e}")
+
+
+async def update_database_metrics(session: AsyncSession):
+    """Обновление метрик базы данных с обработкой ошибок"""
+    try:
+        logger.debug("Updating database metrics...")
+
+        # Размер базы данных
+        size_result = await session.execute(text("SELECT pg_database_size(current_database())"))
+        db_size_bytes = size_result.scalar()
+        if db_size_bytes:
+            DATABASE_SIZE.set(db_size_bytes / 1024 / 1024)
+
+        # Активные подключения
+        connections_result = await session.execute(text("""
+            SELECT count(*) FROM pg_stat_activity
+            WHERE state = 'active' AND datname = current_database()
+        """))
+        active_conn = connections_result.scalar()
+        if active_conn is not None:
+            ACTIVE_CONNECTIONS.set(active_conn)
+
+        logger.debug("Database metrics updated successfully")
+
+    except Exception as e:
+        logger.error(f"Error updating database metrics: {e}")
+
+
+async def reconcile_row_counts(session: AsyncSession, exact_threshold: int):
+    """Сверка счетчиков строк с БД: оценка планировщика для больших таблиц, точный COUNT(*) для малых"""
+    counters: list[RowCounter] = [books_counter, users_counter]
+    try:
+        for counter in counters:
+            # Имя таблицы берется из кода, а не от пользователя
+            estimate_result = await session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": counter.table}
+            )
+            estimate = estimate_result.scalar()
+
+            # reltuples = -1, пока таблицу ни разу не анализировали
+            if estimate is None or estimate < exact_threshold:
+                count_result = await session.execute(text(f"SELECT COUNT(*) FROM {counter.table}"))
+                actual = count_result.scalar()
+            else:
+                actual = estimate
+
+            counter.reconcile(actual)
+            logger.debug(f"Row count reconciled - {counter.table}: {actual}")
+
+    except Exception as e:
+        logger.error(f"Error reconciling row counts: {e}")
+
+
+
+
+class MetricsCollector:
+    """Фоновая задача, обновляющая системные и БД-метрики со своим интервалом.
+
+    /metrics только сериализует уже посчитанный реестр и не ходит ни в psutil, ни в БД.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        interval: float,
+        reconcile_interval: float,
+        exact_count_threshold: int
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.exact_count_threshold = exact_count_threshold
+        self._task: Optional[asyncio.Task] = None
+        # Первая сверка счетчиков - сразу при старте
+        self._next_reconcile = 0.0
+
+
+
+    def start(self) -> None:
+        if self._task is None:
+            # Первый вызов cpu_percent(None) задает точку отсчета и всегда возвращает 0
+            psutil.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._run(), name="metrics-collector")
+            logger.info(f"MetricsCollector: запущен, интервал {self.interval} с")
+
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("MetricsCollector: остановлен")
+
+
+
+    async def collect(self) -> None:
+        """Один проход сбора метрик"""
+        # psutil делает системные вызовы (disk_usage может подвиснуть на сетевой ФС) - уводим из event loop
+        await asyncio.to_thread(update_system_metrics)
+        await asyncio.to_thread(cleanup_dead_workers)
+        async with self.session_factory() as session:
+            await update_database_metrics(session)
+
+            if time.monotonic() >= self._next_reconcile:
+                await reconcile_row_counts(session, self.exact_count_threshold)
+                self._next_reconcile = time.monotonic() + self.reconcile_interval
+
+
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.collect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"MetricsCollector: ошибка сбора метрик - {e}")
+            await asyncio.sleep(self.interval)
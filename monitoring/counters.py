@@ -0,0 +1,55 @@
+from prometheus_client import Gauge
+
+from monitoring.metrics import BOOKS_COUNT, USERS_COUNT, ROW_COUNT_DRIFT
+
+from monitoring.multiprocess import aggregated_value
+
+
+
+
+class RowCounter:
+    """Количество строк таблицы, которое ведут CRUD-операции записи.
+
+    Вместо COUNT(*) на каждый сбор метрик значение меняется на +n/-n при записи
+    и периодически сверяется с БД (MetricsCollector), расхождение уходит в ROW_COUNT_DRIFT.
+
+    Каждый воркер экспортирует только свою долю (gauge с multiprocess_mode='livesum'):
+    свои +n/-n и поправки своих сверок. Число строк - сумма долей всех воркеров;
+    сверка доводит эту сумму до значения из БД, меняя только долю сверяющего воркера.
+    """
+
+    def __init__(self, table: str, gauge: Gauge):
+        self.table = table
+        self.gauge = gauge
+        self.metric_name = gauge.describe()[0].name
+        self.share = 0
+
+
+
+    @property
+    def value(self) -> int:
+        """Число строк по всем воркерам - то же, что отдает /metrics"""
+        total = aggregated_value(self.metric_name)
+        return int(total) if total is not None else self.share
+
+
+
+    def add(self, delta: int) -> None:
+        self.share += delta
+        self.gauge.set(self.share)
+
+
+
+    def reconcile(self, actual: int) -> None:
+        # Записи других воркеров между COUNT и чтением суммы дают небольшую ошибку,
+        # ее исправит следующая сверка
+        drift = self.value - actual
+        ROW_COUNT_DRIFT.labels(table=self.table).set(drift)
+        self.share -= drift
+        self.gauge.set(self.share)
+
+
+
+
+books_counter = RowCounter("books", BOOKS_COUNT)
+users_counter = RowCounter("users", USERS_COUNT)
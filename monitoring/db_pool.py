@@ -0,0 +1,46 @@
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from monitoring.metrics import DB_POOL_CHECKED_OUT, DB_POOL_IDLE, DB_POOL_OVERFLOW, DB_POOL_WAIT_SECONDS
+
+
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который экспортирует свое состояние и время ожидания соединения.
+
+    Имя пула (метка pool) передается через create_async_engine(..., pool_logging_name=...).
+    """
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            # Включает и ожидание свободного соединения, и открытие нового
+            DB_POOL_WAIT_SECONDS.labels(pool=self._metrics_name).observe(time.perf_counter() - start_time)
+            self._update_gauges()
+
+
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._update_gauges()
+
+
+
+    @property
+    def _metrics_name(self) -> str:
+        return self.logging_name or "primary"
+
+
+
+    def _update_gauges(self) -> None:
+        name = self._metrics_name
+        DB_POOL_CHECKED_OUT.labels(pool=name).set(self.checkedout())
+        DB_POOL_IDLE.labels(pool=name).set(self.checkedin())
+        # overflow() отрицателен, пока пул не заполнен до pool_size
+        DB_POOL_OVERFLOW.labels(pool=name).set(max(self.overflow(), 0))
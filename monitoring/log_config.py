@@ -0,0 +1,111 @@
+import os
+
+import random
+
+import sys
+
+from loguru import logger
+
+from monitoring.multiprocess import is_multiprocess
+
+
+
+
+# Единая настройка логгирования: вызывается один раз из main.py
+# Пустой LOG_FILE - только stderr (например, когда логи собирает оркестратор)
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Уровни для отдельных модулей: "CRUD=WARNING,endpoints.books_routers=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# JSON-строки вместо текста (для сборщиков логов)
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"
+# Доля INFO/DEBUG сообщений горячих модулей, которая попадает в лог
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SAMPLED_MODULES = os.getenv("LOG_SAMPLED_MODULES", "CRUD,endpoints")
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") == "1"
+# diagnose выводит значения переменных в трейсбеке - дорого и может раскрыть данные
+LOG_DIAGNOSE = os.getenv("LOG_DIAGNOSE", "0") == "1"
+
+_configured = False
+
+
+
+def _parse_levels(spec: str) -> dict[str, int]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            module, level = item.split("=", 1)
+            levels[module.strip()] = logger.level(level.strip().upper()).no
+    return levels
+
+
+
+def _make_filter(default_level: int, module_levels: dict[str, int], sampled_modules: tuple[str, ...]):
+    # Длинные префиксы проверяются первыми, чтобы CRUD.books перекрывал CRUD
+    prefixes = sorted(module_levels, key=len, reverse=True)
+    warning_level = logger.level("WARNING").no
+
+    def record_filter(record) -> bool:
+        name = record["name"] or ""
+        level = default_level
+        for prefix in prefixes:
+            if name == prefix or name.startswith(prefix + "."):
+                level = module_levels[prefix]
+                break
+
+        level_no = record["level"].no
+        if level_no < level:
+            return False
+        if level_no < warning_level and LOG_SAMPLE_RATE < 1.0 and name.startswith(sampled_modules):
+            return random.random() < LOG_SAMPLE_RATE
+        return True
+
+    return record_filter
+
+
+
+def _process_log_file(path: str) -> str:
+    """Свой файл на каждый воркер: enqueue=True не защищает ротацию от соседних процессов"""
+    if not is_multiprocess():
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext or '.log'}"
+
+
+
+def setup_logging() -> None:
+    """Один набор обработчиков на процесс; запись в файл идет из фонового потока (enqueue=True)"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    default_level = logger.level(LOG_LEVEL.upper()).no
+    module_levels = _parse_levels(LOG_LEVELS)
+    sampled_modules = tuple(m.strip() for m in LOG_SAMPLED_MODULES.split(",") if m.strip())
+    record_filter = _make_filter(default_level, module_levels, sampled_modules)
+    # Сообщения ниже минимального уровня отбрасываются loguru еще до вызова фильтра
+    min_level = min([default_level, *module_levels.values()])
+
+    logger.remove()
+    if LOG_CONSOLE:
+        logger.add(sys.stderr, level=min_level, filter=record_filter, enqueue=True, serialize=LOG_JSON, diagnose=False)
+    if not LOG_FILE:
+        return
+    logger.add(
+        _process_log_file(LOG_FILE),
+        rotation="10 MB",
+        retention="30 days",
+        level=min_level,
+        filter=record_filter,
+        enqueue=True,
+        serialize=LOG_JSON,
+        backtrace=True,
+        diagnose=LOG_DIAGNOSE,
+    )
+
+
+
+async def shutdown_logging() -> None:
+    """Дожидается записи сообщений из очереди"""
+    await logger.complete()
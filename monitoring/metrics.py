@@ -0,0 +1,119 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+
+# Все метрики приложения объявлены здесь, чтобы их могли обновлять и main.py, и CRUD/auth слои
+# без циклических импортов. Регистрируются в стандартном реестре prometheus_client.
+#
+# multiprocess_mode задает, как gauge агрегируется между воркерами (см. monitoring/multiprocess.py);
+# в однопроцессном режиме параметр игнорируется. live* - значения только живых воркеров.
+
+
+# Технические метрики 
+REQUEST_COUNT = Counter(
+    'http_requests_total', 
+    'Total HTTP Requests', 
+    ['method', 'endpoint', 'status_code']
+)
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request duration in seconds',
+    ['method', 'endpoint']
+)
+
+
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'HTTP response body size in bytes',
+    ['method', 'endpoint'],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+)
+
+
+# Сколько SQL запросов и времени БД стоил один HTTP запрос (monitoring/sql_metrics.py)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Number of SQL statements executed per HTTP request',
+    ['method', 'endpoint'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+
+
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Total SQL execution time per HTTP request',
+    ['method', 'endpoint']
+)
+
+
+# Системные метрики
+CPU_USAGE = Gauge('cpu_usage_percent', 'CPU usage percentage', multiprocess_mode='livemostrecent')
+MEMORY_USAGE = Gauge('memory_usage_mb', 'Memory usage in MB', multiprocess_mode='livemostrecent')
+DISK_USAGE = Gauge('disk_usage_percent', 'Disk usage percentage', multiprocess_mode='livemostrecent')
+
+
+# Бизнес-метрики
+DATABASE_SIZE = Gauge('database_size_mb', 'Database size in MB', multiprocess_mode='livemostrecent')
+# Счетчики строк: каждый воркер пишет свою долю (см. monitoring/counters.py), итог - сумма по живым воркерам
+BOOKS_COUNT = Gauge('books_count', 'Total number of books in database', multiprocess_mode='livesum')
+USERS_COUNT = Gauge('users_count', 'Total number of registered users', multiprocess_mode='livesum')
+ACTIVE_CONNECTIONS = Gauge(
+    'postgres_active_connections',
+    'Number of active database connections',
+    multiprocess_mode='livemostrecent'
+)
+ROW_COUNT_DRIFT = Gauge(
+    'row_count_reconcile_drift',
+    'Difference between the incremental row count and the database at last reconciliation',
+    ['table'],
+    multiprocess_mode='liveall'
+)
+
+
+# Метрики кэшей
+CACHE_HITS = Counter('cache_hits_total', 'Cache hits', ['cache'])
+CACHE_MISSES = Counter('cache_misses_total', 'Cache misses', ['cache'])
+CACHE_EVICTIONS = Counter('cache_evictions_total', 'Cache evictions', ['cache', 'reason'])
+CACHE_SIZE = Gauge('cache_size', 'Number of entries in cache', ['cache'], multiprocess_mode='livesum')
+PRINCIPAL_CACHE_SAVED_SECONDS = Counter(
+    'principal_cache_saved_seconds_total',
+    'Estimated users-table query time saved by principal cache hits'
+)
+
+
+# Метрики хэширования паролей (bcrypt в пуле потоков)
+PASSWORD_HASH_QUEUE = Gauge(
+    'password_hash_queue_depth',
+    'Password hash/verify calls waiting for a worker',
+    multiprocess_mode='livesum'
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    'password_hash_duration_seconds',
+    'Password hash/verify duration in seconds',
+    ['operation']
+)
+
+
+# Метрики пула соединений с БД (monitoring/db_pool.py)
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections checked out of the pool', ['pool'], multiprocess_mode='livesum')
+DB_POOL_IDLE = Gauge('db_pool_idle', 'Idle connections in the pool', ['pool'], multiprocess_mode='livesum')
+DB_POOL_OVERFLOW = Gauge('db_pool_overflow', 'Connections opened above pool_size', ['pool'], multiprocess_mode='livesum')
+DB_POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds',
+    'Time spent waiting for a pooled connection',
+    ['pool'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_duration_seconds',
+    'SQL statement execution time by normalized statement',
+    ['statement']
+)
+
+
+# Метрики контроля допуска к БД (session/admission.py)
+ADMISSION_ACTIVE = Gauge('db_admission_active', 'Requests currently admitted to the database', multiprocess_mode='livesum')
+ADMISSION_QUEUE_LENGTH = Gauge('db_admission_queue_length', 'Requests waiting for database admission', multiprocess_mode='livesum')
+ADMISSION_SHED = Counter('db_admission_shed_total', 'Requests rejected with 503 by admission control', ['priority', 'reason'])
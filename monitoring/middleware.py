@@ -0,0 +1,77 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from monitoring.metrics import (
+    REQUEST_COUNT, REQUEST_DURATION, RESPONSE_SIZE,
+    REQUEST_DB_QUERIES, REQUEST_DB_DURATION,
+)
+
+from monitoring.sql_metrics import start_request_db_stats
+
+
+
+
+# Метка для запросов, не попавших ни в один маршрут (404): сырой путь в метке дал бы бесконечно много серий
+UNMATCHED_ENDPOINT = "__unmatched__"
+
+
+def route_template(scope: Scope) -> str:
+    """Шаблон маршрута (/books/update_book/{book_id}) вместо фактического пути"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Маршруты Starlette (например /docs) не кладут route в scope, но их пути статичны
+    if "endpoint" in scope:
+        return scope["path"]
+    return UNMATCHED_ENDPOINT
+
+
+
+
+class PrometheusMiddleware:
+    """ASGI middleware для сбора метрик HTTP запросов.
+
+    В отличие от @app.middleware("http") не оборачивает запрос/ответ в объекты Starlette
+    и не буферизует StreamingResponse - только перехватывает send.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        db_stats = start_request_db_stats()
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            method = scope["method"]
+            # Маршрут известен только после того, как роутер обработал запрос
+            endpoint = route_template(scope)
+
+            REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
+            REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+            RESPONSE_SIZE.labels(method=method, endpoint=endpoint).observe(response_size)
+            REQUEST_DB_QUERIES.labels(method=method, endpoint=endpoint).observe(db_stats.queries)
+            REQUEST_DB_DURATION.labels(method=method, endpoint=endpoint).observe(db_stats.seconds)
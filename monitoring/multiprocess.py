@@ -0,0 +1,86 @@
+import os
+
+import glob
+
+from typing import Optional
+
+from loguru import logger
+
+from prometheus_client import CollectorRegistry, REGISTRY, multiprocess
+
+
+
+
+# prometheus_client переходит в multiprocess-режим, если эта переменная задана ДО импорта метрик.
+# Каждый воркер пишет значения в свои файлы в каталоге, /metrics в любом воркере агрегирует их все.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def is_multiprocess() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Вызывается в мастер-процессе до запуска воркеров: создает каталог и удаляет файлы прошлого запуска"""
+    os.makedirs(path, exist_ok=True)
+    for stale_file in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale_file)
+    os.environ[MULTIPROC_DIR_ENV] = path
+    logger.info(f"Prometheus multiprocess: каталог метрик {path}")
+
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Реестр для /metrics: в multiprocess-режиме собирает значения всех воркеров"""
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+
+def aggregated_value(name: str) -> Optional[float]:
+    """Значение метрики без меток, агрегированное по воркерам так же, как его отдает /metrics"""
+    return metrics_registry().get_sample_value(name)
+
+
+
+def mark_current_process_dead() -> None:
+    """При штатном завершении воркера убирает его live-gauge файлы"""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+
+def cleanup_dead_workers() -> None:
+    """Убирает live-gauge файлы воркеров, завершившихся аварийно (без on_shutdown).
+
+    Файлы счетчиков и гистограмм не трогаем - накопленные значения мертвых воркеров должны остаться в сумме.
+    """
+    if not is_multiprocess():
+        return
+
+    path = os.environ[MULTIPROC_DIR_ENV]
+    pids = set()
+    for live_file in glob.glob(os.path.join(path, "gauge_live*_*.db")):
+        pid = os.path.basename(live_file)[:-len(".db")].rsplit("_", 1)[-1]
+        if pid.isdigit():
+            pids.add(int(pid))
+
+    for pid in pids:
+        if not _process_alive(pid):
+            multiprocess.mark_process_dead(pid, path)
+            logger.info(f"Prometheus multiprocess: удалены метрики завершившегося воркера {pid}")
+
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
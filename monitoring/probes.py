@@ -0,0 +1,121 @@
+import asyncio
+
+import time
+
+from typing import Optional
+
+from loguru import logger
+
+from sqlalchemy import text
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+
+
+class HealthProbe:
+    """Фоновые проверки для /livez и /readyz.
+
+    Тикер измеряет задержку event loop, пинг БД обновляется не чаще ping_interval.
+    Обработчики проб только читают готовое состояние и не ходят в БД.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        pool_capacity: int,
+        tick_interval: float,
+        ping_interval: float,
+        ping_timeout: float
+    ):
+        self.engine = engine
+        self.pool_capacity = pool_capacity
+        self.tick_interval = tick_interval
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+
+        self.loop_lag = 0.0
+        self.last_tick = time.monotonic()
+        self.db_ok = False
+        self.db_checked_at: Optional[float] = None
+        self.db_error: Optional[str] = None
+        self._tasks: list[asyncio.Task] = []
+
+
+
+    def start(self) -> None:
+        if not self._tasks:
+            self.last_tick = time.monotonic()
+            self._tasks = [
+                asyncio.create_task(self._tick(), name="health-loop-ticker"),
+                asyncio.create_task(self._ping(), name="health-db-ping"),
+            ]
+            logger.info(f"HealthProbe: запущен, пинг БД каждые {self.ping_interval} с")
+
+
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+
+    async def _tick(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.tick_interval)
+            self.last_tick = time.monotonic()
+            # Насколько позже заказанного проснулись - столько loop был занят чужой работой
+            self.loop_lag = max(self.last_tick - started - self.tick_interval, 0.0)
+
+
+
+    async def _ping_once(self) -> None:
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+
+
+    async def _ping(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._ping_once(), self.ping_timeout)
+                self.db_ok = True
+                self.db_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.db_ok = False
+                self.db_error = str(e) or type(e).__name__
+                logger.warning(f"HealthProbe: пинг БД не прошел - {self.db_error}")
+            self.db_checked_at = time.monotonic()
+            await asyncio.sleep(self.ping_interval)
+
+
+
+    def heartbeat_age(self) -> float:
+        """Сколько секунд назад тикер последний раз проснулся"""
+        return time.monotonic() - self.last_tick
+
+
+
+    def db_ping_age(self) -> Optional[float]:
+        if self.db_checked_at is None:
+            return None
+        return time.monotonic() - self.db_checked_at
+
+
+
+    def pool_status(self) -> dict:
+        checked_out = self.engine.pool.checkedout()
+        return {
+            "checked_out": checked_out,
+            "capacity": self.pool_capacity,
+            "available": max(self.pool_capacity - checked_out, 0),
+        }
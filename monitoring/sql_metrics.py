@@ -0,0 +1,121 @@
+import os
+
+import random
+
+import re
+
+import time
+
+from contextvars import ContextVar
+
+from dataclasses import dataclass
+
+from typing import Optional
+
+from loguru import logger
+
+from sqlalchemy import event
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from monitoring.metrics import DB_QUERY_SECONDS
+
+
+
+
+# Запросы дольше порога пишутся в лог (с выборкой, чтобы при деградации БД не залить лог)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_LOG_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_LOG_SAMPLE_RATE", "1.0"))
+# Ограничение числа различных запросов в метке statement; остальные попадают в "other"
+SQL_MAX_TRACKED_STATEMENTS = int(os.getenv("SQL_MAX_TRACKED_STATEMENTS", "200"))
+
+_OTHER_STATEMENT = "other"
+_tracked_statements: set[str] = set()
+
+_WHITESPACE = re.compile(r"\s+")
+# Многострочный VALUES (...), (...) и IN (...) дают разный текст при разном числе строк/параметров
+_VALUES_LIST = re.compile(r"VALUES\s*\(.*\)", re.IGNORECASE)
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_NUMBER = re.compile(r"(?<!\$)\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+
+
+@dataclass
+class RequestDbStats:
+    """Число запросов и суммарное время БД в рамках одного HTTP запроса"""
+    queries: int = 0
+    seconds: float = 0.0
+
+
+_request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+
+def start_request_db_stats() -> RequestDbStats:
+    """Вызывается middleware в начале запроса; все SQL этого запроса попадут в возвращенный объект"""
+    stats = RequestDbStats()
+    _request_db_stats.set(stats)
+    return stats
+
+
+
+def normalize_statement(statement: str) -> str:
+    """Текст запроса без литералов и переменной длины списков - ключ для метрики"""
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _VALUES_LIST.sub("VALUES (...)", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _STRING.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    return normalized[:300]
+
+
+
+def _statement_label(statement: str) -> str:
+    normalized = normalize_statement(statement)
+    if normalized in _tracked_statements:
+        return normalized
+    if len(_tracked_statements) >= SQL_MAX_TRACKED_STATEMENTS:
+        return _OTHER_STATEMENT
+    _tracked_statements.add(normalized)
+    return normalized
+
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    label = _statement_label(statement)
+    DB_QUERY_SECONDS.labels(statement=label).observe(duration)
+
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += duration
+
+    if duration * 1000 >= SLOW_QUERY_THRESHOLD_MS and random.random() < SLOW_QUERY_LOG_SAMPLE_RATE:
+        # Параметры не пишем: в них могут быть пароли и персональные данные
+        logger.warning(f"Slow query {duration * 1000:.1f} ms: {label}")
+
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute не вызывается для упавшего запроса - убираем его отметку времени
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключает замер времени каждого SQL запроса к движку"""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -1,5 +1,9 @@
 from pydantic import BaseModel
 
+from typing import Literal, Optional
+
+from datetime import datetime
+
 
 
 class BookSchema(BaseModel):
@@ -11,7 +15,47 @@ class BooklIdShcema(BookSchema):
     id: int
     title: str
     author: str
+    class Config:
+        from_attributes = True  # Для работы с SQLAlchemy объектами
+
+
+class BooksPageSchema(BaseModel):
+    items: list[BooklIdShcema]
+    next_cursor: Optional[str] = None
+
+
+class BookSearchResultSchema(BooklIdShcema):
+    score: float
+
+
+class BooksSearchPageSchema(BaseModel):
+    items: list[BookSearchResultSchema]
+    next_offset: Optional[int] = None
+
+
+class BulkBatchResultSchema(BaseModel):
+    batch: int
+    status: str
+    count: int
+    ids: list[int] = []
+    error: Optional[str] = None
+
+
+class BulkAddResultSchema(BaseModel):
+    created: int
+    failed: int
+    batches: list[BulkBatchResultSchema]
+
+
+class BookChangeSchema(BaseModel):
+    id: int
+    op: Literal["upsert", "delete"]
+    title: Optional[str] = None
+    author: Optional[str] = None
+    changed_at: datetime
 
 
-class Config:
-        from_attributes = True
\ No newline at end of file
+class BookChangesPageSchema(BaseModel):
+    items: list[BookChangeSchema]
+    next_cursor: Optional[str] = None
+    has_more: bool
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, EmailStr
 
+from typing import Optional
+
 
 
 class UserSchema(BaseModel):
@@ -24,4 +26,16 @@ class UserOut(BaseModel):
 
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class Principal(BaseModel):
+    """Пользователь, восстановленный из claims JWT без обращения к БД"""
+    id: int
+    username: str
+    role: str
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+
+import heapq
+
+import itertools
+
+from fastapi import HTTPException, Request, status
+
+from loguru import logger
+
+from monitoring.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_LENGTH, ADMISSION_SHED
+
+
+
+
+# Приоритеты: меньше - важнее
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Приоритет по шаблону маршрута; берется самый длинный подходящий префикс
+ROUTE_PRIORITIES = {
+    "/auth": PRIORITY_HIGH,
+    "/health": PRIORITY_HIGH,
+    "/test-db": PRIORITY_HIGH,
+    "/auth/get_all_users": PRIORITY_LOW,
+    "/books/get_books": PRIORITY_LOW,
+    "/books/search": PRIORITY_LOW,
+    "/books/bulk_add": PRIORITY_LOW,
+    "/books/export": PRIORITY_LOW,
+    "/books/changes": PRIORITY_LOW,
+}
+
+_ROUTE_PREFIXES = sorted(ROUTE_PRIORITIES, key=len, reverse=True)
+
+
+
+def route_priority(request: Request) -> int:
+    route = request.scope.get("route")
+    path = route.path if route is not None else request.url.path
+    for prefix in _ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return ROUTE_PRIORITIES[prefix]
+    return PRIORITY_NORMAL
+
+
+
+
+class AdmissionController:
+    """Ограничивает число запросов, одновременно работающих с БД.
+
+    Сверх лимита запросы ждут в ограниченной очереди по приоритету. Если очередь полна
+    или ожидание слишком долгое, запрос сразу получает 503 с Retry-After,
+    а не висит до таймаута пула вместе со всеми остальными.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+
+
+    def _shed(self, priority: int, reason: str) -> HTTPException:
+        ADMISSION_SHED.labels(priority=str(priority), reason=reason).inc()
+        logger.warning(f"AdmissionController: запрос с приоритетом {priority} отклонен ({reason})")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите запрос позже",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+
+    def _update_gauges(self) -> None:
+        ADMISSION_ACTIVE.set(self._active)
+        ADMISSION_QUEUE_LENGTH.set(len(self._waiters))
+
+
+
+    def _remove_waiter(self, entry: tuple[int, int, asyncio.Future]) -> None:
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+
+
+
+    async def acquire(self, priority: int) -> None:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            # Очередь полна: вытесняем наименее важного ожидающего, если новый запрос важнее
+            worst = max(self._waiters)
+            if worst[0] <= priority:
+                raise self._shed(priority, "queue_full")
+            self._remove_waiter(worst)
+            worst[2].set_exception(self._shed(worst[0], "preempted"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        self._update_gauges()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove_waiter(entry)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Слот выдан в момент таймаута - возвращаем его
+                self.release()
+            else:
+                future.cancel()
+            self._update_gauges()
+            raise self._shed(priority, "timeout")
+        except asyncio.CancelledError:
+            # Клиент ушел, пока запрос ждал в очереди
+            self._remove_waiter(entry)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()
+            else:
+                future.cancel()
+            self._update_gauges()
+            raise
+
+
+
+    def release(self) -> None:
+        # Слот передается следующему по приоритету ожидающему, счетчик активных не меняется
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self._active -= 1
+        self._update_gauges()
@@ -0,0 +1,108 @@
+import hashlib
+
+import itertools
+
+import time
+
+from typing import Optional
+
+from fastapi import Request
+
+from loguru import logger
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from cache import TTLCache
+
+
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Ключ клиента для read-your-writes: хэш токена, иначе адрес клиента"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode()).hexdigest()
+    if request.client is not None:
+        return request.client.host
+    return None
+
+
+
+
+class ReplicaRouter:
+    """Выбор реплики для чтения.
+
+    - round-robin по здоровым репликам, упавшая реплика исключается на cooldown секунд;
+    - после записи клиент sticky_seconds читает с primary, чтобы видеть свои изменения;
+    - без здоровых реплик чтение идет на primary.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replicas: list[async_sessionmaker],
+        sticky_seconds: float,
+        unhealthy_cooldown: float
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.unhealthy_cooldown = unhealthy_cooldown
+        self._retry_at = [0.0] * len(replicas)
+        self._round_robin = itertools.cycle(range(len(replicas))) if replicas else None
+        self._sticky = TTLCache("read_your_writes", maxsize=100_000, ttl=sticky_seconds)
+
+
+
+    def mark_write(self, key: Optional[str]) -> None:
+        if key is not None and self.replicas:
+            self._sticky.set(key, True)
+
+
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        return key is not None and self._sticky.get(key) is not None
+
+
+
+    def pick(self) -> Optional[int]:
+        """Индекс здоровой реплики или None"""
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            index = next(self._round_robin)
+            if self._retry_at[index] <= now:
+                return index
+        return None
+
+
+
+    def mark_unhealthy(self, index: int, error: Exception) -> None:
+        self._retry_at[index] = time.monotonic() + self.unhealthy_cooldown
+        logger.warning(f"ReplicaRouter: реплика {index} недоступна на {self.unhealthy_cooldown} с - {error}")
+
+
+
+    def new_session(self) -> AsyncSession:
+        """Сессия для фонового чтения (метрики, выгрузка): реплика, если есть здоровая"""
+        index = self.pick() if self.replicas else None
+        factory = self.primary if index is None else self.replicas[index]
+        return factory()
+
+
+
+    async def open_read_session(self, key: Optional[str]) -> AsyncSession:
+        """Сессия для чтения в запросе; соединение берется сразу, чтобы при ошибке уйти на primary"""
+        if not self.replicas or self.is_sticky(key):
+            return self.primary()
+
+        index = self.pick()
+        if index is None:
+            return self.primary()
+
+        session = self.replicas[index]()
+        try:
+            await session.connection()
+            return session
+        except Exception as e:
+            await session.close()
+            self.mark_unhealthy(index, e)
+            return self.primary()
@@ -0,0 +1,132 @@
+import asyncio
+
+import os
+
+from fastapi import HTTPException
+
+from loguru import logger
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from session.session_db import engine, replica_engines, replica_router, DB_POOL_SIZE
+
+from CRUD.books import BooksCRUD
+
+from auth.authorization import get_user_by_id, get_user_by_username
+
+from schema.book_schema import BooklIdShcema, BooksPageSchema, BooksSearchPageSchema
+
+from schema.user_schema import Principal, Token, UserOut
+
+
+
+
+# Сколько соединений открыть заранее (не больше pool_size - лишние все равно закроются при возврате)
+DB_POOL_WARM_CONNECTIONS = min(int(os.getenv("DB_POOL_WARM_CONNECTIONS", str(DB_POOL_SIZE))), DB_POOL_SIZE)
+WARM_UP_RETRY_SECONDS = float(os.getenv("WARM_UP_RETRY_SECONDS", "2"))
+
+_ready = False
+_task = None
+
+book_crud = BooksCRUD()
+
+
+
+def is_ready() -> bool:
+    """True после успешного прогрева - до этого /ready отвечает 503"""
+    return _ready
+
+
+
+async def _prime_connection(session: AsyncSession) -> None:
+    """Горячие запросы: asyncpg готовит prepared statement на этом соединении, SQLAlchemy кэширует компиляцию"""
+    await book_crud.read_books_page(session, limit=50)
+    await book_crud.search_books(session, "warmup", limit=20)
+    try:
+        await book_crud.read_book_by_id(session, 0)
+    except HTTPException as e:
+        # 404 ожидаем, а ошибка БД (500) должна сорвать прогрев
+        if e.status_code != 404:
+            raise
+    await get_user_by_username(session, "")
+    await get_user_by_id(session, 0)
+
+
+
+def _prime_serializers() -> None:
+    """Первый вызов сериализации схем ответов - до первого реального запроса"""
+    book = {"id": 0, "title": "", "author": ""}
+    BooklIdShcema.model_validate(book).model_dump_json()
+    BooksPageSchema.model_validate({"items": [book], "next_cursor": None}).model_dump_json()
+    BooksSearchPageSchema.model_validate({"items": [{**book, "score": 0.0}], "next_offset": None}).model_dump_json()
+    UserOut.model_validate({"id": 0, "username": "", "email": "warmup@example.com", "role": "user"}).model_dump_json()
+    Principal.model_validate({"id": 0, "username": "", "role": "user"}).model_dump_json()
+    Token.model_validate({"access_token": "", "token_type": "bearer"}).model_dump_json()
+
+
+
+async def _warm_engine(target: AsyncEngine) -> None:
+    """Открывает соединения пула одного движка и прогревает на каждом горячие запросы"""
+    results = await asyncio.gather(
+        *(target.connect() for _ in range(DB_POOL_WARM_CONNECTIONS)),
+        return_exceptions=True,
+    )
+    connections = [result for result in results if isinstance(result, AsyncConnection)]
+    try:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        for connection in connections:
+            async with AsyncSession(bind=connection) as session:
+                await _prime_connection(session)
+    finally:
+        # Соединения возвращаются в пул уже прогретыми; открывшиеся закрываются и при ошибке соседних
+        for connection in connections:
+            await connection.close()
+
+
+
+async def warm_up() -> None:
+    """Прогрев primary и всех реплик: горячие GET-запросы читают с реплик"""
+    await _warm_engine(engine)
+    for index, replica in enumerate(replica_engines):
+        try:
+            await _warm_engine(replica)
+        except Exception as e:
+            # Недоступная реплика не держит готовность: до конца cooldown чтение идет на прогретый primary
+            replica_router.mark_unhealthy(index, e)
+    _prime_serializers()
+
+
+
+async def _warm_up_until_ready() -> None:
+    global _ready
+    while True:
+        try:
+            await warm_up()
+            _ready = True
+            logger.info(f"Прогрев завершен: {DB_POOL_WARM_CONNECTIONS} соединений, приложение готово")
+            return
+        except Exception as e:
+            logger.error(f"Ошибка прогрева, повтор через {WARM_UP_RETRY_SECONDS} с - {e}")
+            await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+
+
+
+def start_warm_up() -> None:
+    """Прогрев в фоне: liveness отвечает сразу, а /ready - только после прогрева"""
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_warm_up_until_ready(), name="db-warm-up")
+
+
+
+async def stop_warm_up() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,60 @@
+import os
+
+import importlib.util
+
+import uvicorn
+
+from loguru import logger
+
+from monitoring.multiprocess import MULTIPROC_DIR_ENV, prepare_multiprocess_dir
+
+
+
+# Продакшен-запуск: несколько воркеров, uvloop/httptools и настройки из переменных окружения.
+# main здесь НЕ импортируется: воркеры импортируют его сами, уже с подготовленным окружением.
+#
+# Перезапуск воркеров без остановки сервера: kill -HUP <pid мастер-процесса>.
+# Мастер-процесс (супервизор uvicorn) есть только при WEB_CONCURRENCY > 1: с одним воркером сервер
+# работает в этом же процессе, SIGHUP его завершает, а перезапуск - дело внешнего менеджера процессов.
+
+
+def _env_int(name: str, default: int | None) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+
+if __name__ == "__main__":
+    workers = _env_int("WEB_CONCURRENCY", os.cpu_count() or 1)
+
+    # Метрики всех воркеров в одном /metrics (см. monitoring/multiprocess.py)
+    if workers > 1:
+        prepare_multiprocess_dir(os.getenv(MULTIPROC_DIR_ENV, "/tmp/booknote_prometheus"))
+
+    # Воркер перезапускается после N запросов - ограничивает рост памяти. Перезапускает его супервизор,
+    # а без супервизора (один воркер) сервис после N запросов просто остановился бы
+    limit_max_requests = _env_int("UVICORN_LIMIT_MAX_REQUESTS", None)
+    if limit_max_requests is not None and workers == 1:
+        logger.warning("UVICORN_LIMIT_MAX_REQUESTS игнорируется: с одним воркером его некому перезапустить")
+        limit_max_requests = None
+
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=_env_int("PORT", 8000),
+        workers=workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        backlog=_env_int("UVICORN_BACKLOG", 2048),
+        timeout_keep_alive=_env_int("UVICORN_KEEP_ALIVE", 5),
+        # Сверх лимита одновременных соединений uvicorn сразу отвечает 503
+        limit_concurrency=_env_int("UVICORN_LIMIT_CONCURRENCY", None),
+        limit_max_requests=limit_max_requests,
+        timeout_graceful_shutdown=_env_int("UVICORN_GRACEFUL_TIMEOUT", 30),
+        access_log=os.getenv("UVICORN_ACCESS_LOG", "0") == "1",
+    )
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+from fastapi import HTTPException
+
+from session.admission import AdmissionController, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+
+
+
+def make_controller(max_concurrency=1, max_queue=10, queue_timeout=1.0) -> AdmissionController:
+    return AdmissionController(max_concurrency, max_queue, queue_timeout, retry_after=1)
+
+
+async def settle():
+    # Дать ожидающим задачам дойти до очереди / забрать переданный слот
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+
+def test_fast_path_admits_up_to_limit():
+    async def scenario():
+        controller = make_controller(max_concurrency=2)
+        await controller.acquire(PRIORITY_NORMAL)
+        await controller.acquire(PRIORITY_LOW)
+        assert controller._active == 2
+        assert controller._waiters == []
+
+        controller.release()
+        controller.release()
+        assert controller._active == 0
+
+    asyncio.run(scenario())
+
+
+
+def test_release_hands_slot_to_highest_priority():
+    async def scenario():
+        controller = make_controller()
+        await controller.acquire(PRIORITY_NORMAL)
+
+        order = []
+
+        async def waiter(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+
+        low = asyncio.create_task(waiter(PRIORITY_LOW))
+        await settle()
+        high = asyncio.create_task(waiter(PRIORITY_HIGH))
+        await settle()
+        assert len(controller._waiters) == 2
+
+        controller.release()
+        await settle()
+        assert order == [PRIORITY_HIGH]
+        # Слот передан, а не освобожден
+        assert controller._active == 1
+
+        controller.release()
+        await asyncio.gather(low, high)
+        assert order == [PRIORITY_HIGH, PRIORITY_LOW]
+
+        controller.release()
+        assert controller._active == 0
+
+    asyncio.run(scenario())
+
+
+
+def test_full_queue_preempts_less_important_waiter():
+    async def scenario():
+        controller = make_controller(max_queue=1)
+        await controller.acquire(PRIORITY_NORMAL)
+
+        low = asyncio.create_task(controller.acquire(PRIORITY_LOW))
+        await settle()
+        high = asyncio.create_task(controller.acquire(PRIORITY_HIGH))
+        await settle()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await low
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "1"
+
+        controller.release()
+        await high
+        assert controller._active == 1
+        assert controller._waiters == []
+
+    asyncio.run(scenario())
+
+
+
+def test_full_queue_sheds_request_of_same_or_lower_priority():
+    async def scenario():
+        controller = make_controller(max_queue=1)
+        await controller.acquire(PRIORITY_NORMAL)
+        queued = asyncio.create_task(controller.acquire(PRIORITY_NORMAL))
+        await settle()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await controller.acquire(PRIORITY_NORMAL)
+        assert exc_info.value.status_code == 503
+
+        controller.release()
+        await queued
+        assert controller._active == 1
+
+    asyncio.run(scenario())
+
+
+
+def test_queue_timeout_sheds_and_leaves_no_waiter():
+    async def scenario():
+        controller = make_controller(queue_timeout=0.05)
+        await controller.acquire(PRIORITY_NORMAL)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await controller.acquire(PRIORITY_HIGH)
+        assert exc_info.value.status_code == 503
+        assert controller._waiters == []
+
+        controller.release()
+        assert controller._active == 0
+
+    asyncio.run(scenario())
+
+
+
+def test_cancelled_waiter_leaves_queue_without_leaking_slot():
+    async def scenario():
+        controller = make_controller()
+        await controller.acquire(PRIORITY_NORMAL)
+
+        waiter = asyncio.create_task(controller.acquire(PRIORITY_NORMAL))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller._waiters == []
+
+        controller.release()
+        assert controller._active == 0
+
+    asyncio.run(scenario())
+
+
+
+def test_cancel_after_handoff_returns_slot():
+    async def scenario():
+        controller = make_controller()
+        await controller.acquire(PRIORITY_NORMAL)
+
+        waiter = asyncio.create_task(controller.acquire(PRIORITY_NORMAL))
+        await settle()
+        # Слот передан ожидающему, но тот отменен раньше, чем успел его забрать
+        controller.release()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Отмена дошла - слот возвращен
+            assert controller._active == 0
+        else:
+            # wait_for мог вернуть уже готовый результат - тогда слот у вызывающего, и он его освободит
+            assert controller._active == 1
+            controller.release()
+            assert controller._active == 0
+        assert controller._waiters == []
+
+    asyncio.run(scenario())